@@ -0,0 +1,128 @@
+import time
+import threading
+from collections import OrderedDict
+from langchain.memory import ConversationBufferMemory, ConversationSummaryBufferMemory
+from utils.tracing import record_cache
+
+# Defaults for the regulation chatbot memory
+RECENT_TURNS = 4            # turns kept verbatim (one turn = question + answer)
+MAX_MEMORY_TOKENS = 1500    # hard cap on verbatim history sent with each question
+TOKENS_PER_WORD = 1.3       # rough estimate; the chat models here have no tokenizer in LangChain
+MAX_SUMMARY_WORDS = 300     # cap on the running summary of older turns
+MAX_IDLE_SECONDS = 30 * 60  # chains unused for this long are evicted
+MAX_SESSIONS = 50           # upper bound on chains kept in the process
+
+
+# ---------------- Windowed Summary Memory ----------------
+class WindowedSummaryMemory(ConversationSummaryBufferMemory):
+    """
+    Keeps the last `k` turns verbatim and rolls everything older into a running summary.
+
+    The verbatim window is additionally capped at `max_token_limit` tokens and the
+    summary at `max_summary_words` words, so the history resent to the LLM stays bounded.
+    Tokens are estimated from word counts: the parent's `get_num_tokens_from_messages`
+    only works for OpenAI models and raises for Mixtral/llama3.
+    """
+    k: int = RECENT_TURNS
+    max_summary_words: int = MAX_SUMMARY_WORDS
+
+    @staticmethod
+    def estimate_tokens(messages):
+        return int(sum(len(str(message.content).split()) for message in messages) * TOKENS_PER_WORD)
+
+    def prune(self) -> None:
+        buffer = self.chat_memory.messages
+        overflow = max(0, len(buffer) - 2 * self.k)
+
+        # Token cap on what is left of the window, dropping whole turns where possible
+        while overflow < len(buffer) and self.estimate_tokens(buffer[overflow:]) > self.max_token_limit:
+            overflow += min(2, len(buffer) - overflow)
+
+        if overflow > 0:
+            pruned_messages = buffer[:overflow]
+            del buffer[:overflow]
+            self.moving_summary_buffer = self.predict_new_summary(pruned_messages, self.moving_summary_buffer)
+
+        # Keep the newest part of the summary: predict_new_summary appends the latest turns at the end
+        words = self.moving_summary_buffer.split()
+        if len(words) > self.max_summary_words:
+            self.moving_summary_buffer = " ".join(words[-self.max_summary_words:])
+
+
+def build_memory(llm, mode="summary", k=RECENT_TURNS, max_token_limit=MAX_MEMORY_TOKENS):
+    """
+    Creates the conversation memory for a QA chain.
+
+    Args:
+        llm: model used to write the running summary (mode="summary" only).
+        mode: "summary" for bounded windowed-summary memory, "buffer" for the full history.
+    """
+    if mode == "buffer":
+        return ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+    if mode == "summary":
+        return WindowedSummaryMemory(
+            llm=llm,
+            k=k,
+            max_token_limit=max_token_limit,
+            memory_key="chat_history",
+            return_messages=True
+        )
+    raise ValueError(f"Unknown memory mode: {mode}")
+
+
+# ---------------- Per-session Chain Store ----------------
+class SessionChainStore:
+    """
+    Process-wide store of QA chains keyed by (session id, law name).
+
+    Chains idle for longer than `max_idle_seconds` are evicted, and the least
+    recently used ones are dropped once more than `max_sessions` are held.
+    """
+
+    def __init__(self, max_idle_seconds=MAX_IDLE_SECONDS, max_sessions=MAX_SESSIONS):
+        self.max_idle_seconds = max_idle_seconds
+        self.max_sessions = max_sessions
+        self._chains = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id, law_name, factory):
+        """Returns the session's chain for `law_name`, creating it with `factory(law_name)` if needed."""
+        with self._lock:
+            self._evict_locked()
+            entry = self._chains.get(session_id)
+            hit = entry is not None and entry["law"] == law_name
+            if hit:
+                entry["last_used"] = time.time()
+                self._chains.move_to_end(session_id)
+        record_cache("qa_chain", hit)
+        if hit:
+            return entry["chain"]
+
+        # Building loads a vector store and an LLM client, so other sessions must not wait on it
+        entry = {"law": law_name, "chain": factory(law_name), "last_used": time.time()}
+        with self._lock:
+            self._chains.pop(session_id, None)
+            self._chains[session_id] = entry
+            self._evict_locked()
+        return entry["chain"]
+
+    def drop(self, session_id):
+        with self._lock:
+            self._chains.pop(session_id, None)
+
+    def evict_idle(self):
+        with self._lock:
+            return self._evict_locked()
+
+    def _evict_locked(self):
+        cutoff = time.time() - self.max_idle_seconds
+        evicted = [sid for sid, entry in self._chains.items() if entry["last_used"] < cutoff]
+        for sid in evicted:
+            del self._chains[sid]
+        while len(self._chains) > self.max_sessions:
+            sid, _ = self._chains.popitem(last=False)
+            evicted.append(sid)
+        return evicted
+
+    def __len__(self):
+        return len(self._chains)
@@ -1,117 +1,285 @@
-import streamlit as st
-from rag.policy_store import load_policy_vector
-from rag.laws_store import load_regulation_vectorstore
-from query_map import query_map
-from langchain.chat_models import ChatGroq
-from langchain.schema import Document
 import os
-
-# Load API Key
+import json
+import time
 from dotenv import load_dotenv
+from langchain_groq import ChatGroq
+from rag.laws_store import load_regulation_vectorstore, regulation_store_path
+from rag.policy_store import load_store_meta, policy_domain, vectorstore_source_url
+from rag.embeddings import EMBEDDING_BACKEND
+from agents.policy_summary import load_vector_store
+from utils.query_map import query_map
+from utils.tracing import stage, record_llm_usage, record_cache
+from utils.results_store import ResultsStore, hash_store_directory, hash_vectorstore, hash_text, combine_fingerprint
+
 load_dotenv()
 
 # Load Groq API Key
 groq_api_key = os.getenv("GROQ_API_KEY")
 
+LLM_MODEL = "llama3-8b-8192"
+
+POLICY_VECTORSTORE_PATH = "data/vector_stores/policy_store"
+
 # --- Load the LLM ---
 def load_llm():
     return ChatGroq(
         temperature=0.4,
-        model_name="llama3-8b-8192",
+        model_name=LLM_MODEL,
         api_key=groq_api_key
     )
 
 # --- Compliance Check Prompt Template ---
-def generate_compliance_prompt(policy_docs, gdpr_docs, ccpa_docs, questions):
+def generate_compliance_prompt(policy_text, gdpr_text, ccpa_text, questions, policy_type):
     prompt = f"""
-You are a senior legal compliance auditor with expertise in data privacy laws like GDPR and CCPA.
+You are a Privacy Compliance Expert. You need to check if the given policy is compliant with {policy_type}.
 
-You are tasked with evaluating a website's privacy-related policy documents to check whether they fully comply with GDPR and CCPA. Use the official regulation texts provided and ensure your evaluation is based only on these.
+Below are relevant reference documents (from regulations like GDPR/CCPA):
+---------------------
+Policy:
+{policy_text}
+---------------------
+GDPR:
+{gdpr_text}
+---------------------
+CCPA:
+{ccpa_text}
+---------------------
 
----
+Based on these references, analyze the provided policy and determine whether it is compliant.
 
-📄 **Website Policy Documents**:
-{policy_docs}
+Please answer in the following STRICT JSON format only (without any markdown, explanation outside the JSON, or commentary):
 
-📘 **GDPR Law Reference**:
-{gdpr_docs}
+Your Response Format (Strict JSON):
+{{
+    "overall_status": "Compliant/Non-Compliant/Partially Compliant",
+    "explanation": "A high-level summary explaining your decision",
+    "questions": [
+        {{
+            "question": "Does the policy mention how user data is collected?",
+            "status": "Yes/No/Partially",
+            "explanation": "Explain why based on the policy content",
+            "regulation": "GDPR Article 5"  // or relevant CCPA section
+        }},
+        {{
+            "question": "Does the policy mention the user’s right to delete their data?",
+            "status": "...",
+            "explanation": "...",
+            "regulation": "..."
+        }}
+        // Add 3-5 key questions based on compliance requirements
+    ]
+}}
+Only output the JSON.
+"""
+    return prompt.strip()
 
-📙 **CCPA Law Reference**:
-{ccpa_docs}
 
----
+# --- Run a full compliance check ---
+def load_compliance_stores(policy_store_path=POLICY_VECTORSTORE_PATH):
+    """Loads the policy, GDPR and CCPA vector stores used by a compliance check."""
+    return {
+        "policy": load_vector_store(policy_store_path),
+        "GDPR": load_regulation_vectorstore("GDPR"),
+        "CCPA": load_regulation_vectorstore("CCPA")
+    }
 
-🔍 **Evaluation Criteria**:
-- Consider the following specific questions and criteria:
-{questions}
 
----
+def run_compliance_check(policy_type, policy_store_path=POLICY_VECTORSTORE_PATH, progress=None, k=8, stores=None, llm=None):
+    """
+    Retrieves policy, GDPR and CCPA context for `policy_type` and asks the LLM for a JSON verdict.
 
-📝 **Your Output Must Include**:
+    Args:
+        policy_type: key of `query_map` ("Privacy Policy", "Terms of Use", "Cookie Policy").
+        policy_store_path: folder of the saved policy vector store.
+        progress: optional callback `progress(stage, fraction)` used to report each stage.
+        stores: optional preloaded stores from `load_compliance_stores` (skips loading from disk).
+        llm: optional preloaded LLM (defaults to `load_llm()`).
 
-1. **Summary of Findings**:
-    - A short executive summary explaining whether the document is largely compliant, partially compliant, or non-compliant.
+    Returns:
+        dict parsed from the LLM's JSON report.
+    """
+    report_progress = progress or (lambda stage, fraction: None)
 
-2. **Detailed Section-wise Assessment**:
-    For each criteria/question:
-    - State whether it's:
-        - ✅ Compliant
-        - ⚠ Partially Compliant
-        - ❌ Non-Compliant
-    - Justify your evaluation with:
-        - A clear explanation
-        - Specific quotes or sections from the policy
-        - Corresponding regulation clauses from GDPR/CCPA
+    questions = query_map.get(policy_type)
+    if not questions:
+        raise ValueError(f"Unknown policy type: {policy_type}")
 
-3. **Recommended Actions**:
-    - For each non-compliant or partially compliant item, suggest precise corrective actions.
+    # Load vector stores for policy, GDPR, and CCPA
+    report_progress("Loading vectorstores", 0.1)
+    stores = stores or load_compliance_stores(policy_store_path)
+    policy_vs, gdpr_vs, ccpa_vs = stores["policy"], stores["GDPR"], stores["CCPA"]
 
-4. **Confidence Level**:
-    - Mention your confidence level in this evaluation (High / Medium / Low).
+    # Retrieve documents for each regulation (policy, GDPR, and CCPA)
+    report_progress("Retrieving relevant documents", 0.3)
+    query = " ".join(questions)
+    with stage("retrieval", store="policy", k=k):
+        policy_docs = policy_vs.similarity_search(query, k=k)
+    with stage("retrieval", store="GDPR", k=k):
+        gdpr_docs = gdpr_vs.similarity_search(query, k=k)
+    with stage("retrieval", store="CCPA", k=k):
+        ccpa_docs = ccpa_vs.similarity_search(query, k=k)
 
-Be objective and cite sources wherever possible.
-    """.strip()
-    return prompt
+    with stage("prompt_build", chunks=len(policy_docs) + len(gdpr_docs) + len(ccpa_docs)) as info:
+        # Combine the text from the retrieved documents
+        policy_text = "\n\n".join([doc.page_content for doc in policy_docs])
+        gdpr_text = "\n\n".join([doc.page_content for doc in gdpr_docs])
+        ccpa_text = "\n\n".join([doc.page_content for doc in ccpa_docs])
 
-# ---------------- TAB 4: Compliance Checker ----------------
-tab4 = st.tabs(["✅ Compliance Checker"])[0]
+        full_prompt = generate_compliance_prompt(policy_text, gdpr_text, ccpa_text, questions, policy_type)
+        info["characters"] = len(full_prompt)
 
-with tab4:
-    st.header("✅ Policy Compliance Checker")
+    report_progress("Analyzing compliance using LLM", 0.5)
+    llm = llm or load_llm()
+    model_name = getattr(llm, "model_name", type(llm).__name__)
+    with stage("llm_call", model=model_name) as info:
+        llm_response = llm.invoke(full_prompt)
+        info["prompt_tokens"], info["completion_tokens"] = record_llm_usage(llm_response, model_name)
 
-    policy_type = st.selectbox("Select Policy Type", list(query_map.keys()))
-    check_button = st.button("Check Compliance")
+    # Extract text content from LLM response
+    llm_text = llm_response.content if hasattr(llm_response, "content") else str(llm_response)
 
-    if check_button:
+    report_progress("Parsing report", 0.9)
+    with stage("json_parse"):
         try:
-            with st.spinner("Loading vectorstores..."):
-                policy_vs = load_policy_vector("data/vector_stores/policy_store")
-                gdpr_vs = load_regulation_vectorstore("GDPR")
-                ccpa_vs = load_regulation_vectorstore("CCPA")
+            return json.loads(llm_text)
+        except json.JSONDecodeError:
+            raise RuntimeError(f"LLM response is not valid JSON. Raw response:\n{llm_text}")
+
+
+# --- Materialized results ---
+_results_store = None
+
+def get_results_store():
+    global _results_store
+    if _results_store is None:
+        _results_store = ResultsStore()
+    return _results_store
+
+
+def policy_store_domain(policy_store_path=POLICY_VECTORSTORE_PATH, stores=None):
+    """Domain the policy store was built from ("policy_store" if unknown); preloaded `stores` take precedence."""
+    if stores:
+        source_url = vectorstore_source_url(stores["policy"])
+        return policy_domain(source_url) if source_url else "policy_store"
+    return load_store_meta(policy_store_path).get("domain") or "policy_store"
+
+
+def compliance_fingerprint(policy_type, policy_store_path=POLICY_VECTORSTORE_PATH, k=8, model_name=LLM_MODEL, stores=None):
+    """
+    Hashes every input that can change a compliance report for `policy_type`.
+
+    Store hashes cover chunk text and metadata, not the saved files, so a rebuild from
+    unchanged content keeps its fingerprint. With preloaded `stores` the hashes are taken
+    from those stores, so a report is always saved under the content it was computed from.
+
+    Returns:
+        (fingerprint, inputs) where inputs maps each input name to its own hash/value.
+    """
+    questions = query_map.get(policy_type)
+    if not questions:
+        raise ValueError(f"Unknown policy type: {policy_type}")
+
+    template = generate_compliance_prompt("{policy_text}", "{gdpr_text}", "{ccpa_text}", questions, policy_type)
+    if stores:
+        store_hashes = {name: hash_vectorstore(stores[name]) for name in ("policy", "GDPR", "CCPA")}
+    else:
+        store_hashes = {
+            "policy": hash_store_directory(policy_store_path),
+            "GDPR": hash_store_directory(regulation_store_path("GDPR")),
+            "CCPA": hash_store_directory(regulation_store_path("CCPA"))
+        }
+    inputs = {
+        "policy_store": store_hashes["policy"],
+        "GDPR": store_hashes["GDPR"],
+        "CCPA": store_hashes["CCPA"],
+        "questions": hash_text(json.dumps(questions)),
+        "prompt_template": hash_text(template),
+        "model": model_name,
+        "embedding_backend": EMBEDDING_BACKEND,
+        "k": k
+    }
+    return combine_fingerprint(inputs), inputs
+
+
+def find_stored_report(policy_type, policy_store_path=POLICY_VECTORSTORE_PATH, k=8, model_name=LLM_MODEL, results=None,
+                       stores=None):
+    """
+    Looks up the stored report for the current inputs without calling the LLM.
+
+    Returns:
+        (outcome, fingerprint, inputs); outcome is None when the inputs changed since the last check.
+    """
+    results = results or get_results_store()
+    domain = policy_store_domain(policy_store_path, stores)
+
+    with stage("fingerprint"):
+        fingerprint, inputs = compliance_fingerprint(policy_type, policy_store_path, k, model_name, stores)
+
+    stored = results.lookup(domain, policy_type, fingerprint)
+    record_cache("compliance_results", stored is not None)
+    if not stored:
+        return None, fingerprint, inputs
+    outcome = {
+        "domain": domain,
+        "policy_type": policy_type,
+        "report": stored["report"],
+        "cached": True,
+        "fingerprint": fingerprint,
+        "created_at": stored["created_at"]
+    }
+    return outcome, fingerprint, inputs
+
 
-            questions = query_map[policy_type]
+def get_compliance_report(policy_type, policy_store_path=POLICY_VECTORSTORE_PATH, progress=None, k=8,
+                          stores=None, llm=None, results=None, force=False):
+    """
+    Returns the stored report when all inputs are unchanged, otherwise runs the check and stores it.
 
-            # Fetch top 8 relevant docs for each vectorstore
-            with st.spinner("Retrieving documents..."):
-                policy_docs = policy_vs.similarity_search(" ".join(questions), k=8)
-                gdpr_docs = gdpr_vs.similarity_search(" ".join(questions), k=8)
-                ccpa_docs = ccpa_vs.similarity_search(" ".join(questions), k=8)
+    Returns:
+        dict with "domain", "policy_type", "report", "cached", "fingerprint" and "created_at".
+    """
+    results = results or get_results_store()
+    model_name = getattr(llm, "model_name", LLM_MODEL) if llm else LLM_MODEL
 
-            # Combine docs into strings
-            policy_text = "\n\n".join([doc.page_content for doc in policy_docs])
-            gdpr_text = "\n\n".join([doc.page_content for doc in gdpr_docs])
-            ccpa_text = "\n\n".join([doc.page_content for doc in ccpa_docs])
+    if not force:
+        stored, _, _ = find_stored_report(policy_type, policy_store_path, k, model_name, results, stores)
+        if stored:
+            return stored
 
-            # Load LLM and create prompt
-            llm = load_llm()
-            full_prompt = generate_compliance_prompt(policy_text, gdpr_text, ccpa_text, questions)
+    # Fingerprint the stores the check actually runs on, not whatever is on disk by the time it finishes
+    if not stores:
+        if progress:
+            progress("Loading vectorstores", 0.05)
+        stores = load_compliance_stores(policy_store_path)
+    domain = policy_store_domain(policy_store_path, stores)
+    with stage("fingerprint"):
+        fingerprint, inputs = compliance_fingerprint(policy_type, policy_store_path, k, model_name, stores)
 
-            with st.spinner("Analyzing compliance using LLM..."):
-                response = llm.invoke(full_prompt)
+    report = run_compliance_check(policy_type, policy_store_path, progress, k, stores, llm)
+    results.save(domain, policy_type, fingerprint, inputs, report)
+    return {
+        "domain": domain,
+        "policy_type": policy_type,
+        "report": report,
+        "cached": False,
+        "fingerprint": fingerprint,
+        "created_at": time.time()
+    }
 
-            st.success("✅ Compliance Check Completed")
-            st.subheader("📊 Compliance Report")
-            st.text_area("Compliance Report", response, height=600)
 
-        except Exception as e:
-            st.error(f"❌ Error checking compliance: {e}")
+def refresh_compliance_results(policy_store_path=POLICY_VECTORSTORE_PATH, progress=None, stores=None, llm=None):
+    """Brings every policy type up to date; only types whose inputs changed are recomputed."""
+    report_progress = progress or (lambda stage, fraction: None)
+    outcomes = {}
+    policy_types = list(query_map.keys())
+    model_name = getattr(llm, "model_name", LLM_MODEL) if llm else LLM_MODEL
+    for i, policy_type in enumerate(policy_types):
+        report_progress(f"Checking {policy_type}", i / len(policy_types))
+        stored, _, _ = find_stored_report(policy_type, policy_store_path, model_name=model_name, stores=stores)
+        if stored:
+            outcomes[policy_type] = stored
+            continue
+        # Stores are only loaded once, and only if some policy type is stale
+        stores = stores or load_compliance_stores(policy_store_path)
+        outcomes[policy_type] = get_compliance_report(policy_type, policy_store_path, stores=stores, llm=llm, force=True)
+    return outcomes
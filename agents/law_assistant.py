@@ -2,7 +2,7 @@ import streamlit as st
 from rag.laws_store import build_regulation_vectorstore, load_regulation_vectorstore
 from langchain.chat_models import ChatOpenAI
 from langchain.chains import ConversationalRetrievalChain
-from langchain.memory import ConversationBufferMemory
+from agents.chat_memory import build_memory
 import os
 from dotenv import load_dotenv
 
@@ -25,7 +25,7 @@ def prepare_vectorstores():
     build_regulation_vectorstore(regulation_docs)
 
 # --- STEP 2: Load QA chain ---
-def create_qa_chain(law_name):
+def create_qa_chain(law_name, memory_mode="summary"):
     vectorstore = load_regulation_vectorstore(law_name)
     llm = ChatOpenAI(
         temperature=0,
@@ -33,7 +33,7 @@ def create_qa_chain(law_name):
         openai_api_key=together_api_key,
         base_url="https://api.together.xyz/v1"
     )
-    memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+    memory = build_memory(llm, mode=memory_mode)
 
     chain = ConversationalRetrievalChain.from_llm(
         llm=llm,
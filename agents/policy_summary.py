@@ -1,10 +1,15 @@
 import os
 import json
+import hashlib
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from rag.embeddings import get_embedding_model
 from langchain_groq import ChatGroq
 import warnings
+from utils.tracing import stage, record_llm_usage, record_cache, record_count
+from utils.summary_cache import SummaryCache
 
 warnings.filterwarnings("ignore")
 load_dotenv()
@@ -12,6 +17,15 @@ load_dotenv()
 # Load API key
 groq_api_key = os.getenv("GROQ_API_KEY")
 
+# Full-document ("full") summary settings
+SUMMARY_MAP_WORKERS = int(os.getenv("SUMMARY_MAP_WORKERS", "4"))
+SECTION_MAX_CHARS = 6000     # upper bound on the policy text sent per map call
+SECTION_MIN_CHARS = 1500     # content-defined boundaries are ignored below this
+SECTION_BOUNDARY_MOD = 4     # roughly one chunk in four ends a section
+REDUCE_MAX_CHARS = 12000     # notes above this are merged in batches before the final summary
+MAX_REDUCE_LEVELS = 3        # merge rounds before the notes are cut to REDUCE_MAX_CHARS
+SECTION_PROMPT_VERSION = "v1"  # bump when build_section_prompt changes to invalidate cached notes
+
 # ---------------------- Load the LLM ----------------------
 def load_llm():
     return ChatGroq(
@@ -23,8 +37,9 @@ def load_llm():
 # ---------------- Load FAISS Vector Store ----------------
 def load_vector_store(path):
     try:
-        embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-        return FAISS.load_local(folder_path=path, embeddings=embedding_model, allow_dangerous_deserialization=True)
+        embedding_model = get_embedding_model()
+        with stage("store_load", store="policy"):
+            return FAISS.load_local(folder_path=path, embeddings=embedding_model, allow_dangerous_deserialization=True)
     except Exception as e:
         raise RuntimeError(f"Failed to load vector store: {e}")
 
@@ -67,12 +82,9 @@ def print_clean_summary(output):
         print("[WARNING] Failed to cleanly parse summary output. Showing raw text:\n")
         print(output)
 
-# ------------- Query & Summarize Policies ---------------
-def query_policy_summary(vectorstore, query, k=6):
-    docs = vectorstore.similarity_search(query, k=k)
-    context = "\n\n".join([doc.page_content for doc in docs])
-
-    system_prompt = f"""
+# ---------------- Summary Prompt Template ----------------
+def build_summary_prompt(context):
+    return f"""
 You are a legal language expert and policy summarization assistant.
 
 Given the policy text below, write a professional, easy-to-read summary that includes the following sections:
@@ -93,13 +105,182 @@ Policy Text:
 {context}
 """
 
+# ------------- Query & Summarize Policies ---------------
+def query_policy_summary(vectorstore, query, k=6):
+    with stage("retrieval", store="policy", k=k):
+        docs = vectorstore.similarity_search(query, k=k)
+    context = "\n\n".join([doc.page_content for doc in docs])
+
+    with stage("prompt_build", chunks=len(docs)):
+        system_prompt = build_summary_prompt(context)
+
     llm = load_llm()
-    response = llm.invoke(system_prompt)
+    with stage("llm_call", model=llm.model_name) as info:
+        response = llm.invoke(system_prompt)
+        info["prompt_tokens"], info["completion_tokens"] = record_llm_usage(response, llm.model_name)
+    return response.content
+
+
+# ------------- Full-document (map-reduce) Summary ---------------
+def build_section_prompt(section_text):
+    return f"""
+You are a legal language expert reading one part of a longer policy.
+
+Extract concise bullet-point notes from the text below under these headings, skipping headings the text does not cover:
+Overview, Data Collection, User Rights, Consent & Preferences, Third-party Sharing, Data Retention & Security, Risks or Compliance Issues.
+
+- Keep concrete details (data types, time periods, named third parties, opt-out mechanisms).
+- Do *not* invent information that is not in the text.
+- Do *not* return JSON.
+
+Policy Text:
+{section_text}
+"""
+
+
+def _chunk_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def policy_chunks_in_order(vectorstore):
+    """Every chunk of a FAISS store in insertion order (i.e. document order)."""
+    ids = vectorstore.index_to_docstore_id
+    return [vectorstore.docstore.search(ids[i]).page_content for i in sorted(ids)]
+
+
+def group_sections(chunks, max_chars=SECTION_MAX_CHARS, min_chars=SECTION_MIN_CHARS, boundary_mod=SECTION_BOUNDARY_MOD):
+    """
+    Groups consecutive chunks into sections for the map step.
+
+    Boundaries are content-defined (a chunk whose hash is 0 mod `boundary_mod` closes its
+    section), so an edit to one part of a re-scraped policy only changes the sections
+    around it and the rest keep their cached summaries.
+
+    Returns:
+        list of (section_hash, section_text).
+    """
+    sections, current, size = [], [], 0
+
+    def close():
+        text = "\n\n".join(chunk for _, chunk in current)
+        section_hash = _chunk_hash("".join(chunk_hash for chunk_hash, _ in current))
+        sections.append((section_hash, text))
+
+    for chunk in chunks:
+        if current and size + len(chunk) > max_chars:
+            close()
+            current, size = [], 0
+        chunk_hash = _chunk_hash(chunk)
+        current.append((chunk_hash, chunk))
+        size += len(chunk)
+        if size >= min_chars and int(chunk_hash, 16) % boundary_mod == 0:
+            close()
+            current, size = [], 0
+    if current:
+        close()
+    return sections
+
+
+def _invoke(llm, prompt, stage_name, **attrs):
+    with stage(stage_name, model=llm.model_name, **attrs) as info:
+        response = llm.invoke(prompt)
+        info["prompt_tokens"], info["completion_tokens"] = record_llm_usage(response, llm.model_name)
     return response.content
 
+
+def summarize_section(llm, cache, section_hash, section_text):
+    key = f"{section_hash}:{llm.model_name}:{SECTION_PROMPT_VERSION}"
+    cached = cache.get(key)
+    record_cache("section_summary", cached is not None)
+    if cached is not None:
+        return cached
+    notes = _invoke(llm, build_section_prompt(section_text), "map_llm_call", section=section_hash[:12])
+    cache.put(key, notes)
+    return notes
+
+
+def _split_note(note, limit):
+    """Splits `note` into pieces of at most `limit` characters, preferring line then word breaks."""
+    pieces = []
+    while len(note) > limit:
+        cut = note.rfind("\n", 0, limit)
+        if cut <= 0:
+            cut = note.rfind(" ", 0, limit)
+        if cut <= 0:
+            cut = limit
+        pieces.append(note[:cut])
+        note = note[cut:].lstrip()
+    if note:
+        pieces.append(note)
+    return pieces
+
+
+def reduce_notes(llm, notes, max_chars=REDUCE_MAX_CHARS, max_levels=MAX_REDUCE_LEVELS):
+    """Merges section notes in batches until they fit one prompt; returns at most `max_chars` characters."""
+    level = 0
+    while sum(len(n) for n in notes) > max_chars and level < max_levels:
+        level += 1
+        # Half-limit pieces guarantee every batch merges at least two of them
+        pieces = [piece for note in notes for piece in _split_note(note, max_chars // 2)]
+        batches, batch, size = [], [], 0
+        for piece in pieces:
+            if batch and size + len(piece) > max_chars:
+                batches.append(batch)
+                batch, size = [], 0
+            batch.append(piece)
+            size += len(piece)
+        batches.append(batch)
+        notes = [
+            _invoke(llm, build_section_prompt("\n\n".join(batch)), "reduce_llm_call", level=level)
+            for batch in batches
+        ]
+
+    merged = "\n\n".join(notes)
+    if len(merged) > max_chars:
+        # The LLM did not shrink the notes enough; cut rather than overflow the final prompt
+        print(f"[WARNING] Section notes still {len(merged)} characters after {level} merge rounds; truncating")
+        merged = merged[:max_chars]
+    return merged
+
+
+def summarize_full_policy(vectorstore, max_workers=SUMMARY_MAP_WORKERS, cache=None):
+    """
+    Summarizes the whole policy rather than the top-k retrieved chunks.
+
+    Map: sections are summarized concurrently into notes, reusing cached notes for
+    unchanged sections. Reduce: the notes are merged and passed to the same
+    seven-section prompt as `query_policy_summary`.
+    """
+    cache = cache or SummaryCache()
+    llm = load_llm()
+
+    with stage("sectioning", store="policy") as info:
+        sections = group_sections(policy_chunks_in_order(vectorstore))
+        info["sections"] = len(sections)
+    record_count("summary_sections", len(sections))
+
+    with stage("map", sections=len(sections), workers=max_workers):
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            # Each worker runs in a copy of this context so its stages land in the current trace
+            futures = [
+                pool.submit(contextvars.copy_context().run, summarize_section, llm, cache, section_hash, text)
+                for section_hash, text in sections
+            ]
+            notes = [future.result() for future in futures]
+
+    with stage("reduce", notes=len(notes)):
+        merged = reduce_notes(llm, notes)
+    with stage("prompt_build", chunks=len(notes)):
+        system_prompt = build_summary_prompt(merged)
+    return _invoke(llm, system_prompt, "llm_call")
+
 # --------------- Wrapper for full flow -------------------
-def run_policy_summary_retrieval(vectorstore, query_keywords):
+def run_policy_summary_retrieval(vectorstore, query_keywords, mode="retrieval"):
+    """mode="retrieval" summarizes the top chunks for `query_keywords`; mode="full" summarizes every section."""
     try:
+        if mode == "full":
+            print("[INFO] Summarizing the full policy...")
+            return summarize_full_policy(vectorstore)
         print("[INFO] Querying policy summaries...")
         return query_policy_summary(
             vectorstore=vectorstore,
@@ -0,0 +1,66 @@
+from webscraper import main as scrape_main, sanitize_domain
+from rag.policy_store import build_policy_vectorstore, save_vectorstore
+from agents.policy_summary import run_policy_summary_retrieval, load_vector_store
+from agents.law_assistant import prepare_vectorstores
+from agents.compliance_check import get_compliance_report, refresh_compliance_results, POLICY_VECTORSTORE_PATH
+
+# Background tasks submitted through utils.job_queue.JobQueue.
+# Each takes a `progress(stage, fraction)` callback and returns a JSON-serialisable result.
+
+SUMMARY_QUERY = "data collection, user rights, consent, third-party sharing, retention periods, privacy compliance"
+
+# Shared on-disk resources, passed as JobQueue.submit(reads=..., writes=...)
+POLICY_STORE = "policy_store"
+REGULATION_STORES = "regulation_stores"
+
+
+def job_key(*parts):
+    """Coalescing key for JobQueue.submit, e.g. job_key(domain, policy_type)."""
+    return ":".join(str(part) for part in parts)
+
+
+# ----------------------- Scrape & Store -----------------------
+def scrape_and_store_task(progress, website_url, store_path=POLICY_VECTORSTORE_PATH):
+    progress("Scraping policy", 0.1)
+    scraped_path = scrape_main(website_url)
+
+    with open(scraped_path, "r", encoding="utf-8") as f:
+        policy_text = f.read()
+
+    progress("Building vectorstore from policy", 0.6)
+    vectorstore = build_policy_vectorstore(policy_text, website_url)
+
+    progress("Saving vectorstore", 0.9)
+    save_vectorstore(vectorstore, store_path)
+
+    return {
+        "domain": sanitize_domain(website_url),
+        "scraped_path": scraped_path,
+        "preview": policy_text[:1500]
+    }
+
+
+# ----------------------- Policy Summary -----------------------
+def policy_summary_task(progress, store_path=POLICY_VECTORSTORE_PATH, query=SUMMARY_QUERY, mode="retrieval"):
+    progress("Loading vectorstore", 0.1)
+    vectorstore = load_vector_store(store_path)
+
+    progress("Summarizing full policy" if mode == "full" else "Generating summary", 0.4)
+    return {"summary": run_policy_summary_retrieval(vectorstore, query, mode=mode), "mode": mode}
+
+
+# ----------------------- Regulation Stores -----------------------
+def rebuild_regulations_task(progress):
+    progress("Rebuilding regulation vectorstores", 0.1)
+    prepare_vectorstores()
+    return {"rebuilt": ["GDPR", "CCPA"]}
+
+
+# ----------------------- Compliance Check -----------------------
+def compliance_check_task(progress, policy_type, store_path=POLICY_VECTORSTORE_PATH, force=False):
+    return get_compliance_report(policy_type, policy_store_path=store_path, progress=progress, force=force)
+
+
+def refresh_results_task(progress, store_path=POLICY_VECTORSTORE_PATH):
+    outcomes = refresh_compliance_results(policy_store_path=store_path, progress=progress)
+    return {"recomputed": [name for name, outcome in outcomes.items() if not outcome["cached"]]}
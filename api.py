@@ -0,0 +1,196 @@
+"""
+Headless HTTP API for scraping, policy summaries and compliance checks.
+
+Run with:
+    uvicorn api:app --host 0.0.0.0 --port 8000
+
+Vector stores and LLM clients are loaded once and reused across requests.
+Each endpoint has its own concurrency limit and timeout (see the API_* env vars).
+"""
+import os
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from typing import Literal
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+from dotenv import load_dotenv
+
+from agents.policy_summary import run_policy_summary_retrieval
+from agents.compliance_check import (
+    load_llm, load_compliance_stores, get_compliance_report, get_results_store, POLICY_VECTORSTORE_PATH
+)
+from agents.tasks import SUMMARY_QUERY, scrape_and_store_task
+from utils.query_map import query_map
+from utils.tracing import metrics, start_trace, record_cache
+
+load_dotenv()
+
+# Request limits (concurrent requests per endpoint / seconds)
+MAX_CONCURRENT_CHECKS = int(os.getenv("API_MAX_CONCURRENT_CHECKS", "4"))
+MAX_CONCURRENT_SUMMARIES = int(os.getenv("API_MAX_CONCURRENT_SUMMARIES", "2"))
+CHECK_TIMEOUT = float(os.getenv("API_CHECK_TIMEOUT", "120"))
+SUMMARY_TIMEOUT = float(os.getenv("API_SUMMARY_TIMEOUT", "120"))
+FULL_SUMMARY_TIMEOUT = float(os.getenv("API_FULL_SUMMARY_TIMEOUT", "300"))
+SCRAPE_TIMEOUT = float(os.getenv("API_SCRAPE_TIMEOUT", "300"))
+QUEUE_TIMEOUT = float(os.getenv("API_QUEUE_TIMEOUT", "10"))
+
+
+# ---------------- Warm resources ----------------
+class WarmResources:
+    """Keeps vector stores and the LLM client loaded between requests."""
+
+    def __init__(self, policy_store_path=POLICY_VECTORSTORE_PATH):
+        self.policy_store_path = policy_store_path
+        self._stores = None
+        self._llm = None
+        self._lock = threading.Lock()
+
+    def stores(self):
+        with self._lock:
+            record_cache("api_stores", self._stores is not None)
+            if self._stores is None:
+                self._stores = load_compliance_stores(self.policy_store_path)
+            return self._stores
+
+    def llm(self):
+        with self._lock:
+            record_cache("api_llm", self._llm is not None)
+            if self._llm is None:
+                self._llm = load_llm()
+            return self._llm
+
+    def reload_policy_store(self):
+        with self._lock:
+            self._stores = None
+        return self.stores()
+
+
+resources = WarmResources()
+
+# Per-endpoint semaphores, created inside the running event loop
+limits = {}
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Scraping rewrites the shared policy store, so it is always serialised
+    limits["scrape"] = asyncio.Semaphore(1)
+    limits["summary"] = asyncio.Semaphore(MAX_CONCURRENT_SUMMARIES)
+    limits["compliance"] = asyncio.Semaphore(MAX_CONCURRENT_CHECKS)
+    try:
+        await asyncio.to_thread(resources.stores)
+        await asyncio.to_thread(resources.llm)
+    except Exception as e:
+        # The service still starts; the first scrape creates the policy store
+        print(f"[WARNING] Could not warm up vector stores: {e}")
+    yield
+
+
+app = FastAPI(title="Privacy Policy Compliance API", lifespan=lifespan)
+
+
+async def run_limited(name, timeout, fn, *args, **kwargs):
+    """Runs blocking `fn` in a worker thread under the endpoint's concurrency limit and timeout."""
+    semaphore = limits[name]
+    try:
+        await asyncio.wait_for(semaphore.acquire(), timeout=QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=429, detail=f"Too many concurrent {name} requests, retry later.")
+
+    def traced():
+        with start_trace(name):
+            return fn(*args, **kwargs)
+
+    # The slot is released when the work really finishes, even if the request timed out
+    task = asyncio.ensure_future(asyncio.to_thread(traced))
+    task.add_done_callback(lambda _: semaphore.release())
+    try:
+        return await asyncio.wait_for(asyncio.shield(task), timeout=timeout)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"{name} timed out after {timeout:.0f}s.")
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"{name} failed: {e}")
+
+
+# ---------------- Request models ----------------
+class ScrapeRequest(BaseModel):
+    url: str
+
+
+class SummaryRequest(BaseModel):
+    query: str = SUMMARY_QUERY
+    mode: Literal["retrieval", "full"] = "retrieval"
+
+
+class ComplianceRequest(BaseModel):
+    policy_type: str = "Privacy Policy"
+    force: bool = False
+
+
+# ---------------- Endpoints ----------------
+@app.get("/health")
+async def health():
+    return {"status": "ok", "policy_types": list(query_map.keys())}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    # Covers API traffic only; the Streamlit app serves its own jobs' metrics (STREAMLIT_METRICS_PORT)
+    return metrics.render_prometheus()
+
+
+@app.post("/scrape")
+async def scrape(request: ScrapeRequest):
+    def scrape_and_store():
+        result = scrape_and_store_task(
+            lambda stage, fraction: None, request.url, store_path=resources.policy_store_path
+        )
+        resources.reload_policy_store()
+        return result
+
+    return await run_limited("scrape", SCRAPE_TIMEOUT, scrape_and_store)
+
+
+@app.post("/summary")
+async def summary(request: SummaryRequest):
+    def summarize():
+        vectorstore = resources.stores()["policy"]
+        return {"summary": run_policy_summary_retrieval(vectorstore, request.query, mode=request.mode)}
+
+    timeout = FULL_SUMMARY_TIMEOUT if request.mode == "full" else SUMMARY_TIMEOUT
+    return await run_limited("summary", timeout, summarize)
+
+
+@app.post("/compliance")
+async def compliance(request: ComplianceRequest):
+    if request.policy_type not in query_map:
+        raise HTTPException(status_code=400, detail=f"Unknown policy type: {request.policy_type}")
+
+    def check():
+        return get_compliance_report(
+            request.policy_type,
+            policy_store_path=resources.policy_store_path,
+            stores=resources.stores(),
+            llm=resources.llm(),
+            force=request.force
+        )
+
+    return await run_limited("compliance", CHECK_TIMEOUT, check)
+
+
+@app.get("/results")
+async def results(domain: str = None, policy_type: str = None, limit: int = 50):
+    """Stored compliance reports (newest first); reading them never triggers an LLM call."""
+    return await asyncio.to_thread(get_results_store().history, domain, policy_type, limit)
+
+
+@app.get("/results/changes")
+async def results_changes():
+    """Domains and policy types whose latest status differs from the previous result."""
+    return await asyncio.to_thread(get_results_store().status_changes)
@@ -3,16 +3,22 @@ import os
 from dotenv import load_dotenv
 
 # Local modules
-from webscraper import main as scrape_main
-from rag.policy_store import build_policy_vectorstore, save_vectorstore
-from rag.laws_store import build_regulation_vectorstore, load_regulation_vectorstore
-from agents.policy_summary import run_policy_summary_retrieval, load_vector_store
+from webscraper import sanitize_domain
+from rag.laws_store import load_regulation_vectorstore
+from agents.tasks import (
+    job_key, scrape_and_store_task, policy_summary_task,
+    rebuild_regulations_task, compliance_check_task, refresh_results_task,
+    POLICY_STORE, REGULATION_STORES
+)
+from agents.compliance_check import find_stored_report, get_results_store, policy_store_domain
 from utils.query_map import query_map
+from utils.job_queue import JobQueue, ACTIVE_STATES, DONE, FAILED
+from utils.tracing import start_trace, stage, serve_metrics
 from langchain.chat_models import ChatOpenAI
-from langchain_groq import ChatGroq
 from langchain.chains import ConversationalRetrievalChain
-from langchain.memory import ConversationBufferMemory
-import json
+from agents.chat_memory import build_memory, SessionChainStore
+import time
+import uuid
 
 
 # Load API key
@@ -26,31 +32,8 @@ llm = ChatOpenAI(
     base_url="https://api.together.xyz/v1"
 )
 
-# Load Groq API Key
-groq_api_key = os.getenv("GROQ_API_KEY")
-
-# --- Load the LLM ---
-def load_llm():
-    return ChatGroq(
-        temperature=0.4,
-        model_name="llama3-8b-8192",
-        api_key=groq_api_key
-    )
-
 # ----------------------- Regulation Chatbot Setup -----------------------
-def prepare_vectorstores():
-    with open("docs/gdpr.txt", "r", encoding="utf-8") as f:
-        gdpr_text = f.read()
-    with open("docs/ccpa.txt", "r", encoding="utf-8") as f:
-        ccpa_text = f.read()
-
-    regulation_docs = {
-        "GDPR": gdpr_text,
-        "CCPA": ccpa_text
-    }
-    build_regulation_vectorstore(regulation_docs)
-
-def create_qa_chain(law_name):
+def create_qa_chain(law_name, memory_mode="summary"):
     vectorstore = load_regulation_vectorstore(law_name)
     llm = ChatOpenAI(
         temperature=0,
@@ -58,7 +41,7 @@ def create_qa_chain(law_name):
         openai_api_key=together_api_key,
         base_url="https://api.together.xyz/v1"
     )
-    memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+    memory = build_memory(llm, mode=memory_mode)
     chain = ConversationalRetrievalChain.from_llm(
         llm=llm,
         retriever=vectorstore.as_retriever(),
@@ -66,51 +49,79 @@ def create_qa_chain(law_name):
     )
     return chain
 
-# --- Compliance Check Prompt Template ---
-def generate_compliance_prompt(policy_text, gdpr_text, ccpa_text, questions, policy_type):
-    prompt = f"""
-You are a Privacy Compliance Expert. You need to check if the given policy is compliant with {policy_type}.
-
-Below are relevant reference documents (from regulations like GDPR/CCPA):
----------------------
-Policy:
-{policy_text}
----------------------
-GDPR:
-{gdpr_text}
----------------------
-CCPA:
-{ccpa_text}
----------------------
-
-Based on these references, analyze the provided policy and determine whether it is compliant.
-
-Please answer in the following STRICT JSON format only (without any markdown, explanation outside the JSON, or commentary):
-
-Your Response Format (Strict JSON):
-{{
-    "overall_status": "Compliant/Non-Compliant/Partially Compliant",
-    "explanation": "A high-level summary explaining your decision",
-    "questions": [
-        {{
-            "question": "Does the policy mention how user data is collected?",
-            "status": "Yes/No/Partially",
-            "explanation": "Explain why based on the policy content",
-            "regulation": "GDPR Article 5"  // or relevant CCPA section
-        }},
-        {{
-            "question": "Does the policy mention the user’s right to delete their data?",
-            "status": "...",
-            "explanation": "...",
-            "regulation": "..."
-        }}
-        // Add 3-5 key questions based on compliance requirements
-    ]
-}}
-Only output the JSON.
-"""
-    return prompt.strip()
-
+# Shared across Streamlit sessions so idle sessions' chains can be evicted
+@st.cache_resource
+def get_chain_store():
+    return SessionChainStore()
+
+# Messages kept for display in the chat tab
+MAX_CHAT_DISPLAY_MESSAGES = 100
+
+# Shared worker pool and job table; survives reruns so clicks never restart work
+@st.cache_resource
+def get_job_queue():
+    return JobQueue()
+
+POLL_INTERVAL_SECONDS = 1.5
+STORE_READ_TIMEOUT_SECONDS = 0.5  # UI-thread lookups never wait out a whole scrape
+
+# Jobs run in this process, so its metrics are only visible from here (api.py serves its own);
+# set STREAMLIT_METRICS_PORT=0 to disable. Per-stage timings are also in logs/pipeline.jsonl.
+METRICS_PORT = int(os.getenv("STREAMLIT_METRICS_PORT", "9108"))
+
+@st.cache_resource
+def start_metrics_server():
+    return serve_metrics(METRICS_PORT) if METRICS_PORT else None
+
+start_metrics_server()
+
+def render_job(job_id, label):
+    """Shows the job's current stage and returns it; sets a rerun flag while it is still in flight."""
+    job = get_job_queue().get(job_id) if job_id else None
+    if job is None:
+        return None
+    if job["status"] in ACTIVE_STATES:
+        st.progress(job["progress"] or 0.0, text=f"{label}: {job['stage']}...")
+        st.session_state.poll_jobs = True
+    elif job["status"] == FAILED:
+        st.error(f"❌ {label} failed: {job['error']}")
+    if job["status"] not in ACTIVE_STATES:
+        display_timings(job.get("trace"))
+    return job
+
+def display_timings(trace):
+    """Per-request stage timing panel, shown when enabled in the sidebar."""
+    if not trace or not st.session_state.get("show_timings"):
+        return
+    with st.expander(f"⏱ Stage timings ({trace['total_seconds']:.2f}s total)"):
+        st.dataframe(trace["stages"], use_container_width=True)
+        if trace["counts"]:
+            st.json(trace["counts"])
+
+def display_results_history():
+    results = get_results_store()
+    changes = results.status_changes()
+    if changes:
+        st.markdown("#### 🔔 Status changes")
+        st.dataframe([
+            {**change, "changed_at": time.strftime("%Y-%m-%d %H:%M", time.localtime(change["changed_at"]))}
+            for change in changes
+        ], use_container_width=True)
+
+    domains = results.domains()
+    if not domains:
+        st.info("No stored compliance results yet.")
+        return
+    domain = st.selectbox("Domain", domains, key="history_domain")
+    st.dataframe([
+        {
+            "checked_at": time.strftime("%Y-%m-%d %H:%M", time.localtime(row["created_at"])),
+            "policy_type": row["policy_type"],
+            "overall_status": row["overall_status"],
+            "fingerprint": row["fingerprint"][:12]
+        }
+        for row in results.history(domain=domain)
+    ], use_container_width=True)
 
 def display_compliance_report(report):
     st.markdown(f"### 📋 Overall Status: {report['overall_status']}")
@@ -137,6 +148,11 @@ regulations = ["GDPR", "CCPA"]
 # Tabs
 tab1, tab2, tab3 ,tab4 = st.tabs(["🔍 Scrape & Store", "📝 Policy Summary", "📘 Regulation Q&A", "Compliance Analyst"])
 
+st.sidebar.checkbox("⏱ Show stage timings", key="show_timings")
+
+# Set by render_job while any job shown on this page is still running
+st.session_state.poll_jobs = False
+
 # ----------------------- TAB 1: Scrape & Store -----------------------
 with tab1:
     st.header("🔍 Scrape Privacy Policy & Create Vector Store")
@@ -146,116 +162,143 @@ with tab1:
         if not website_url:
             st.error("Please enter a valid website URL.")
         else:
-            with st.spinner("Scraping policy..."):
-                scraped_path = scrape_main(website_url)
-            st.success("✅ Policy scraped successfully!")
-
-            with open(scraped_path, "r", encoding="utf-8") as f:
-                policy_text = f.read()
-
-            st.info("Building vectorstore from policy...")
-            vectorstore = build_policy_vectorstore(policy_text, website_url)
-            save_vectorstore(vectorstore)
-            st.success("✅ Vector store created and saved.")
-            st.subheader("📄 Sample Policy Preview")
-            st.code(policy_text[:1500])
+            st.session_state.scrape_job = get_job_queue().submit(
+                "scrape", scrape_and_store_task,
+                key=job_key(sanitize_domain(website_url)),
+                writes=[POLICY_STORE],
+                website_url=website_url
+            )
+
+    job = render_job(st.session_state.get("scrape_job"), "Scrape & Store")
+    if job and job["status"] == DONE:
+        st.success("✅ Policy scraped and vector store saved.")
+        st.subheader("📄 Sample Policy Preview")
+        st.code(job["result"]["preview"])
 
 # ----------------------- TAB 2: Policy Summary -----------------------
 with tab2:
     st.header("📝 Generate Policy Summary")
 
+    full_document = st.checkbox(
+        "Summarize the full policy",
+        help="Summarizes every section in parallel instead of the top matching chunks. Unchanged sections are reused from cache."
+    )
     if st.button("Generate Summary"):
-        try:
-            with st.spinner("Generating summary..."):
-                vectorstore = load_vector_store(policy_vectorstore_path)
-                query = "data collection, user rights, consent, third-party sharing, retention periods, privacy compliance"
-                summary = run_policy_summary_retrieval(vectorstore, query)
-            st.success("✅ Summary Ready")
-            st.subheader("📄 Policy Summary")
-            st.text_area("Generated Summary", summary, height=400)
-        except Exception as e:
-            st.error(f"❌ Summary failed: {e}")
+        mode = "full" if full_document else "retrieval"
+        st.session_state.summary_job = get_job_queue().submit(
+            "summary", policy_summary_task, key=job_key(policy_store_domain(), mode),
+            reads=[POLICY_STORE], mode=mode
+        )
+
+    job = render_job(st.session_state.get("summary_job"), "Policy Summary")
+    if job and job["status"] == DONE:
+        st.success("✅ Summary Ready")
+        st.subheader("📄 Policy Summary")
+        st.text_area("Generated Summary", job["result"]["summary"], height=400)
 
 # ----------------------- TAB 3: Regulation Chatbot -----------------------
 with tab3:
     st.header("📘 Regulation Q&A Chatbot: GDPR & CCPA")
 
     if st.button("🔄 Rebuild Regulation Vectorstores"):
-        with st.spinner("Rebuilding vectorstores..."):
-            prepare_vectorstores()
-        st.success("✅ Vectorstores rebuilt successfully!")
+        st.session_state.rebuild_job = get_job_queue().submit(
+            "rebuild_regulations", rebuild_regulations_task, key=job_key(*regulations),
+            writes=[REGULATION_STORES]
+        )
 
+    job = render_job(st.session_state.get("rebuild_job"), "Rebuild Regulation Vectorstores")
+    if job and job["status"] == DONE:
+        st.success("✅ Vectorstores rebuilt successfully!")
     selected_law = st.selectbox("Choose a regulation", regulations)
 
-    if "qa_chain" not in st.session_state or st.session_state.get("law") != selected_law:
-        st.session_state.qa_chain = create_qa_chain(selected_law)
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+
+    if st.session_state.get("law") != selected_law:
         st.session_state.chat_history = []
         st.session_state.law = selected_law
 
+    qa_chain = get_chain_store().get(st.session_state.session_id, selected_law, create_qa_chain)
+
     query = st.chat_input(f"Ask something about {selected_law}...")
 
     if query:
-        with st.spinner("Getting answer..."):
-            result = st.session_state.qa_chain.run(query)
+        with st.spinner("Getting answer..."), start_trace("chat") as trace:
+            with stage("qa_chain", law=selected_law):
+                result = qa_chain.run(query)
+            st.session_state.chat_trace = trace.to_dict()
             st.session_state.chat_history.append(("user", query))
             st.session_state.chat_history.append(("bot", result))
+            st.session_state.chat_history = st.session_state.chat_history[-MAX_CHAT_DISPLAY_MESSAGES:]
 
     for role, message in st.session_state.chat_history:
         with st.chat_message("user" if role == "user" else "assistant"):
             st.markdown(message)
 
+    display_timings(st.session_state.get("chat_trace"))
+
 # ----------------------- TAB 4: Policy Compliance Checker -----------------------
 with tab4:
     st.header("✅ Policy Compliance Checker")
 
     policy_type = st.selectbox("Select Policy Type", list(query_map.keys()))
-    check_button = st.button("Check Compliance")
+    force_recompute = st.checkbox("Recompute even if inputs are unchanged")
+    col1, col2 = st.columns(2)
+    check_button = col1.button("Check Compliance")
+    refresh_button = col2.button("Refresh All Policy Types")
 
     if check_button:
+        stored = None
+        domain = "policy_store"
         try:
-            with st.spinner("🔄 Loading vectorstores..."):
-                # Load vector stores for policy, GDPR, and CCPA
-                policy_vs = load_vector_store("data/vector_stores/policy_store")
-                gdpr_vs = load_regulation_vectorstore("GDPR")
-                ccpa_vs = load_regulation_vectorstore("CCPA")
-
-            # Get the related questions for the selected policy type
-            questions = query_map[policy_type]
-
-            with st.spinner("🔍 Retrieving relevant documents..."):
-                # Retrieve documents for each regulation (policy, GDPR, and CCPA)
-                policy_docs = policy_vs.similarity_search(" ".join(questions), k=8)
-                gdpr_docs = gdpr_vs.similarity_search(" ".join(questions), k=8)
-                ccpa_docs = ccpa_vs.similarity_search(" ".join(questions), k=8)
-
-            # Combine the text from the retrieved documents
-            policy_text = "\n\n".join([doc.page_content for doc in policy_docs])
-            gdpr_text = "\n\n".join([doc.page_content for doc in gdpr_docs])
-            ccpa_text = "\n\n".join([doc.page_content for doc in ccpa_docs])
-
-            # Load the LLM model
-            llm = load_llm()
-
-            # Generate the compliance prompt
-            full_prompt = generate_compliance_prompt(policy_text, gdpr_text, ccpa_text, questions, policy_type)
-
-            with st.spinner("🤖 Analyzing compliance using LLM..."):
-                llm_response = llm.invoke(full_prompt)
-
-            # Extract text content from LLM response
-            llm_text = llm_response.content if hasattr(llm_response, "content") else str(llm_response)
-
-            # Safely extract data: Try loading structured JSON from LLM response
-            try:
-                report_dict = json.loads(llm_text)
-            except json.JSONDecodeError:
-                st.error("❌ LLM response is not valid JSON. Here's the raw response:")
-                st.code(llm_text)
-                raise
-
-            # Display success message and the compliance report
-            st.success("✅ Compliance Check Completed")
-            display_compliance_report(report_dict)
-
+            # Same read locks as the jobs, so a scrape or rebuild mid-save is never read;
+            # if one is running, skip the lookup and let the queued check wait for it
+            with get_job_queue().reading(POLICY_STORE, REGULATION_STORES, timeout=STORE_READ_TIMEOUT_SECONDS):
+                domain = policy_store_domain()
+                if not force_recompute:
+                    stored, _, _ = find_stored_report(policy_type)
+        except FileNotFoundError as e:
+            st.error(f"❌ {e}")
         except Exception as e:
-            st.error(f"❌ An error occurred: {e}")
\ No newline at end of file
+            print(f"[INFO] Stored report lookup skipped: {e}")
+        if stored:
+            # Inputs unchanged: show the stored report without queueing any work
+            st.session_state.compliance_job = None
+            st.session_state.stored_report = stored
+        else:
+            st.session_state.stored_report = None
+            st.session_state.compliance_job = get_job_queue().submit(
+                "compliance", compliance_check_task,
+                key=job_key(domain, policy_type),
+                reads=[POLICY_STORE, REGULATION_STORES],
+                policy_type=policy_type,
+                force=force_recompute
+            )
+
+    if refresh_button:
+        st.session_state.refresh_job = get_job_queue().submit(
+            "refresh_results", refresh_results_task, key=job_key(policy_store_domain()),
+            reads=[POLICY_STORE, REGULATION_STORES]
+        )
+
+    job = render_job(st.session_state.get("refresh_job"), "Refresh Results")
+    if job and job["status"] == DONE:
+        recomputed = job["result"]["recomputed"]
+        st.info(f"Recomputed: {', '.join(recomputed)}" if recomputed else "All stored results are up to date.")
+
+    job = render_job(st.session_state.get("compliance_job"), "Compliance Check")
+    outcome = st.session_state.get("stored_report") or (job["result"] if job and job["status"] == DONE else None)
+    if outcome:
+        # Display success message and the compliance report
+        checked_at = time.strftime("%Y-%m-%d %H:%M", time.localtime(outcome["created_at"]))
+        source = "stored result" if outcome["cached"] else "fresh check"
+        st.success(f"✅ Compliance Check Completed ({outcome['policy_type']}, {outcome['domain']}, {source} from {checked_at})")
+        display_compliance_report(outcome["report"])
+
+    with st.expander("📚 Results history"):
+        display_results_history()
+
+# Poll running jobs by rerunning the script once the whole page has rendered
+if st.session_state.poll_jobs:
+    time.sleep(POLL_INTERVAL_SECONDS)
+    st.rerun()
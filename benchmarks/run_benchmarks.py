@@ -0,0 +1,274 @@
+"""
+Offline benchmark suite for the RAG pipeline.
+
+Uses only checked-in data (data/laws PDFs and data/scraped_policies) and a stub LLM,
+so runs are reproducible and free. From the repository root:
+
+    python -m benchmarks.run_benchmarks --repeats 20
+
+Results are written as JSON to benchmarks/results/ for comparison across versions.
+"""
+import os
+import sys
+import json
+import time
+import glob
+import math
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+
+from PyPDF2 import PdfReader
+
+LAWS_DIR = "data/laws"
+SCRAPED_DIR = "data/scraped_policies"
+RESULTS_DIR = "benchmarks/results"
+RETRIEVAL_KS = (2, 4, 8, 16)
+
+STUB_REPORT = {
+    "overall_status": "Partially Compliant",
+    "explanation": "Stub response used for offline benchmarking.",
+    "questions": [
+        {
+            "question": "Does the policy mention how user data is collected?",
+            "status": "Yes",
+            "explanation": "Stub.",
+            "regulation": "GDPR Article 5"
+        }
+    ]
+}
+
+
+# ---------------- Stub LLM ----------------
+class StubResponse:
+    def __init__(self, content, prompt):
+        self.content = content
+        # Rough whitespace token counts so token accounting still has numbers
+        self.usage_metadata = {"input_tokens": len(prompt.split()), "output_tokens": len(content.split())}
+
+
+class StubLLM:
+    """Returns a fixed JSON compliance report, optionally after a simulated delay."""
+    model_name = "stub-llm"
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def invoke(self, prompt):
+        if self.latency:
+            time.sleep(self.latency)
+        return StubResponse(json.dumps(STUB_REPORT), prompt)
+
+
+# ---------------- Helpers ----------------
+def percentiles(samples):
+    ordered = sorted(samples)
+
+    def pick(q):
+        # Nearest-rank percentile
+        return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(1000 * sum(ordered) / len(ordered), 3),
+        "p50_ms": round(1000 * pick(0.50), 3),
+        "p90_ms": round(1000 * pick(0.90), 3),
+        "p99_ms": round(1000 * pick(0.99), 3),
+        "max_ms": round(1000 * ordered[-1], 3)
+    }
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def rate(count, seconds):
+    return round(count / seconds, 2) if seconds > 0 else None
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+# ---------------- Benchmarks ----------------
+def bench_ingestion(embedding_model, chunk_regulation_text, chunk_policy_text, clean_text, read_pdf):
+    # Mirrors build_*_vectorstore: boilerplate strip, clean, chunk, near-duplicate drop, embed
+    from utils.dedup import strip_boilerplate, dedup_chunks
+
+    results = {"laws": {}, "policies": {}}
+    regulation_texts = {}
+    policy_texts = {}
+
+    for pdf_path in sorted(glob.glob(os.path.join(LAWS_DIR, "*.pdf"))):
+        law_name = os.path.splitext(os.path.basename(pdf_path))[0].upper()
+        pages = len(PdfReader(pdf_path).pages)
+        text, read_s = timed(read_pdf, pdf_path)
+        (stripped, _), boilerplate_s = timed(strip_boilerplate, text)
+        cleaned, clean_s = timed(clean_text, stripped)
+        chunks, chunk_s = timed(chunk_regulation_text, cleaned)
+        (kept, _), dedup_s = timed(dedup_chunks, chunks)
+        kept_chunks = [chunks[i] for i in kept]
+        _, embed_s = timed(embedding_model.embed_documents, kept_chunks)
+        regulation_texts[law_name] = text
+        results["laws"][law_name] = {
+            "pages": pages,
+            "chunks": len(chunks),
+            "chunks_embedded": len(kept_chunks),
+            "pdf_read_s": round(read_s, 4),
+            "boilerplate_s": round(boilerplate_s, 4),
+            "clean_s": round(clean_s, 4),
+            "chunk_s": round(chunk_s, 4),
+            "dedup_s": round(dedup_s, 4),
+            "embed_s": round(embed_s, 4),
+            "pages_per_s": rate(pages, read_s),
+            "chunks_per_s": rate(len(chunks), boilerplate_s + clean_s + chunk_s + dedup_s),
+            "embeddings_per_s": rate(len(kept_chunks), embed_s)
+        }
+
+    for txt_path in sorted(glob.glob(os.path.join(SCRAPED_DIR, "*", "*.txt"))):
+        domain = os.path.basename(os.path.dirname(txt_path))
+        with open(txt_path, "r", encoding="utf-8") as f:
+            text = f.read()
+        (stripped, _), boilerplate_s = timed(strip_boilerplate, text)
+        cleaned, clean_s = timed(clean_text, stripped)
+        chunks, chunk_s = timed(chunk_policy_text, cleaned)
+        (kept, _), dedup_s = timed(dedup_chunks, chunks)
+        kept_chunks = [chunks[i] for i in kept]
+        _, embed_s = timed(embedding_model.embed_documents, kept_chunks)
+        policy_texts[domain] = text
+        results["policies"][domain] = {
+            "characters": len(text),
+            "chunks": len(chunks),
+            "chunks_embedded": len(kept_chunks),
+            "boilerplate_s": round(boilerplate_s, 4),
+            "clean_s": round(clean_s, 4),
+            "chunk_s": round(chunk_s, 4),
+            "dedup_s": round(dedup_s, 4),
+            "embed_s": round(embed_s, 4),
+            "chunks_per_s": rate(len(chunks), boilerplate_s + clean_s + chunk_s + dedup_s),
+            "embeddings_per_s": rate(len(kept_chunks), embed_s)
+        }
+
+    return results, regulation_texts, policy_texts
+
+
+def bench_retrieval(stores, queries, repeats):
+    results = {}
+    for name, store in stores.items():
+        results[name] = {}
+        for k in RETRIEVAL_KS:
+            samples = []
+            for _ in range(repeats):
+                for query in queries:
+                    _, seconds = timed(store.similarity_search, query, k=k)
+                    samples.append(seconds)
+            results[name][f"k={k}"] = percentiles(samples)
+    return results
+
+
+def run(repeats, llm_latency, output_dir):
+    from utils.pdf_reader import read_pdf
+    from utils.utils import clean_text
+    from utils.query_map import query_map
+
+    # Importing the stores loads the shared embedding model
+    start = time.perf_counter()
+    from rag.embeddings import EMBEDDING_BACKEND, EMBEDDING_WORKERS
+    from rag.laws_store import embedding_model, chunk_regulation_text, build_regulation_vectorstore, load_regulation_vectorstore
+    from rag.policy_store import chunk_policy_text, build_policy_vectorstore, save_vectorstore
+    from agents.policy_summary import load_vector_store
+    from agents.compliance_check import run_compliance_check
+    model_load_s = time.perf_counter() - start
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "embedding_model": getattr(embedding_model, "model_name", type(embedding_model).__name__),
+            "embedding_backend": EMBEDDING_BACKEND,
+            "embedding_workers": EMBEDDING_WORKERS,
+            "repeats": repeats,
+            "stub_llm_latency_s": llm_latency
+        },
+        "model_load_s": round(model_load_s, 4)
+    }
+
+    print("[INFO] Benchmarking ingestion...")
+    report["ingestion"], regulation_texts, policy_texts = bench_ingestion(
+        embedding_model, chunk_regulation_text, chunk_policy_text, clean_text, read_pdf
+    )
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print("[INFO] Building temporary vector stores...")
+        # Dedup reports go to the temp dir so the real ones in data/dedup_reports are untouched
+        report_dir = os.path.join(tmp_dir, "dedup_reports")
+        _, build_s = timed(
+            build_regulation_vectorstore, regulation_texts,
+            base_save_path=os.path.join(tmp_dir, "regulations"), report_dir=report_dir
+        )
+        report["regulation_build_s"] = round(build_s, 4)
+
+        policy_paths = {}
+        for domain, text in policy_texts.items():
+            path = os.path.join(tmp_dir, "policies", domain)
+            vectorstore, policy_build_s = timed(build_policy_vectorstore, text, f"https://{domain}", report_dir=report_dir)
+            save_vectorstore(vectorstore, path)
+            policy_paths[domain] = path
+            report.setdefault("policy_build_s", {})[domain] = round(policy_build_s, 4)
+
+        print("[INFO] Benchmarking store load...")
+        load_samples = {}
+        stores = {}
+        for _ in range(repeats):
+            for law in regulation_texts:
+                stores[law], seconds = timed(load_regulation_vectorstore, law, base_path=os.path.join(tmp_dir, "regulations"))
+                load_samples.setdefault(law, []).append(seconds)
+            for domain, path in policy_paths.items():
+                stores[domain], seconds = timed(load_vector_store, path)
+                load_samples.setdefault(domain, []).append(seconds)
+        report["store_load"] = {name: percentiles(samples) for name, samples in load_samples.items()}
+
+        print("[INFO] Benchmarking retrieval...")
+        queries = [" ".join(questions) for questions in query_map.values()]
+        queries += [question for questions in query_map.values() for question in questions]
+        report["retrieval"] = bench_retrieval(stores, queries, repeats)
+
+        print("[INFO] Benchmarking end-to-end compliance checks...")
+        llm = StubLLM(latency=llm_latency)
+        report["compliance_check"] = {}
+        for domain in policy_paths:
+            compliance_stores = {"policy": stores[domain], "GDPR": stores["GDPR"], "CCPA": stores["CCPA"]}
+            for policy_type in query_map:
+                samples = []
+                for _ in range(repeats):
+                    _, seconds = timed(run_compliance_check, policy_type, stores=compliance_stores, llm=llm)
+                    samples.append(seconds)
+                report["compliance_check"][f"{domain}/{policy_type}"] = percentiles(samples)
+
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    output_path = os.path.join(output_dir, f"bench-{stamp}.json")
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"[SUCCESS] Benchmark results saved to: {output_path}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline RAG pipeline benchmarks")
+    parser.add_argument("--repeats", type=int, default=10, help="repetitions per timed measurement")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="simulated stub LLM latency in seconds")
+    parser.add_argument("--output-dir", default=RESULTS_DIR)
+    args = parser.parse_args()
+
+    run(args.repeats, args.llm_latency, args.output_dir)
@@ -0,0 +1,239 @@
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+# "torch" (sentence-transformers, fp32), "onnx" (ONNX Runtime fp32) or "onnx-int8" (dynamic int8 quantization)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+# Worker processes used by the ONNX backends for bulk embedding (1 = in-process only)
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "1"))
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "data/onnx_models")
+
+MAX_SEQ_LENGTH = 256         # all-MiniLM-L6-v2 truncates at 256 word pieces
+MAX_TOKENS_PER_BATCH = 8192  # padded tokens per ONNX batch (batch size adapts to text length)
+MIN_PARALLEL_TEXTS = 256     # smaller requests are encoded in-process
+
+
+# ---------------- ONNX Export ----------------
+def export_onnx(model_name=EMBEDDING_MODEL_NAME, output_dir=ONNX_MODEL_DIR, quantize=False):
+    """
+    Exports the transformer behind `model_name` to ONNX (and optionally int8) and saves its tokenizer.
+
+    Returns:
+        path of the .onnx file to load.
+    """
+    model_dir = os.path.join(output_dir, model_name.split("/")[-1])
+    fp32_path = os.path.join(model_dir, "model.onnx")
+    int8_path = os.path.join(model_dir, "model_int8.onnx")
+    target_path = int8_path if quantize else fp32_path
+    if os.path.exists(target_path):
+        return target_path
+
+    os.makedirs(model_dir, exist_ok=True)
+    if not os.path.exists(fp32_path):
+        import torch
+        from transformers import AutoTokenizer, AutoModel
+
+        print(f"[INFO] Exporting {model_name} to ONNX...")
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModel.from_pretrained(model_name).eval()
+        sample = tokenizer(["Export sample sentence."], return_tensors="pt")
+        input_names = ["input_ids", "attention_mask", "token_type_ids"]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(sample[name] for name in input_names),
+                fp32_path,
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14
+            )
+        tokenizer.save_pretrained(model_dir)
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        print("[INFO] Quantizing ONNX model to int8...")
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+
+    return target_path
+
+
+# ---------------- ONNX Embeddings ----------------
+class OnnxEmbeddings(Embeddings):
+    """
+    Sentence embeddings from an exported ONNX model, matching sentence-transformers output
+    (mean pooling + L2 normalisation).
+
+    Texts are tokenized once, sorted by length and packed into batches of at most
+    `max_tokens_per_batch` padded tokens, so short chunks are not padded to long ones.
+    Bulk requests are split across `workers` processes.
+    """
+
+    def __init__(self, model_path, workers=1, max_tokens_per_batch=MAX_TOKENS_PER_BATCH, intra_op_threads=None):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_path = model_path
+        self.model_name = f"{EMBEDDING_MODEL_NAME} ({os.path.basename(model_path)})"
+        self.workers = workers
+        self.max_tokens_per_batch = max_tokens_per_batch
+        self.tokenizer = AutoTokenizer.from_pretrained(os.path.dirname(model_path))
+
+        options = ort.SessionOptions()
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = {item.name for item in self.session.get_inputs()}
+        self._pool = None
+
+    # ----- encoding -----
+    def _length_batches(self, encoded_ids):
+        order = sorted(range(len(encoded_ids)), key=lambda i: len(encoded_ids[i]))
+        batch = []
+        for index in order:
+            # Sorted ascending, so the current text is the longest in the batch
+            if batch and (len(batch) + 1) * len(encoded_ids[index]) > self.max_tokens_per_batch:
+                yield batch
+                batch = []
+            batch.append(index)
+        if batch:
+            yield batch
+
+    def encode(self, texts):
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        encoded = self.tokenizer(list(texts), truncation=True, max_length=MAX_SEQ_LENGTH)
+        vectors = [None] * len(texts)
+        for batch in self._length_batches(encoded["input_ids"]):
+            features = self.tokenizer.pad(
+                {name: [encoded[name][i] for i in batch] for name in encoded.keys()},
+                return_tensors="np"
+            )
+            inputs = {name: features[name].astype(np.int64) for name in self.input_names if name in features}
+            if "token_type_ids" in self.input_names and "token_type_ids" not in inputs:
+                inputs["token_type_ids"] = np.zeros_like(inputs["input_ids"])
+            hidden = self.session.run(None, inputs)[0]
+
+            # Mean pooling over real tokens, then L2 normalisation
+            mask = inputs["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            for row, index in enumerate(batch):
+                vectors[index] = pooled[row]
+        return np.vstack(vectors)
+
+    # ----- multi-process bulk encoding -----
+    def _get_pool(self):
+        if self._pool is None:
+            threads = max(1, (os.cpu_count() or 1) // self.workers)
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.model_path, self.max_tokens_per_batch, threads)
+            )
+        return self._pool
+
+    def encode_parallel(self, texts):
+        shard_size = -(-len(texts) // self.workers)
+        shards = [texts[i:i + shard_size] for i in range(0, len(texts), shard_size)]
+        return np.vstack(list(self._get_pool().map(_encode_in_worker, shards)))
+
+    # ----- LangChain Embeddings interface -----
+    def embed_documents(self, texts):
+        texts = list(texts)
+        if self.workers > 1 and len(texts) >= MIN_PARALLEL_TEXTS:
+            vectors = self.encode_parallel(texts)
+        else:
+            vectors = self.encode(texts)
+        return vectors.tolist()
+
+    def embed_query(self, text):
+        return self.encode([text])[0].tolist()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+# Worker-process state for OnnxEmbeddings.encode_parallel
+_worker_model = None
+
+
+def _init_worker(model_path, max_tokens_per_batch, intra_op_threads):
+    global _worker_model
+    _worker_model = OnnxEmbeddings(model_path, max_tokens_per_batch=max_tokens_per_batch, intra_op_threads=intra_op_threads)
+
+
+def _encode_in_worker(texts):
+    return _worker_model.encode(texts)
+
+
+# ---------------- Backend Selection ----------------
+_models = {}
+
+
+def get_embedding_model(backend=None):
+    """
+    Returns the shared embedding model for `backend` (defaults to EMBEDDING_BACKEND).
+
+    All vector stores must be queried with the backend that built them; run
+    `python -m rag.embeddings` to check ONNX parity against the PyTorch vectors.
+    """
+    backend = backend or EMBEDDING_BACKEND
+    if backend not in _models:
+        if backend == "torch":
+            from langchain_community.embeddings import HuggingFaceEmbeddings
+            _models[backend] = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
+        elif backend in ("onnx", "onnx-int8"):
+            model_path = export_onnx(quantize=backend == "onnx-int8")
+            _models[backend] = OnnxEmbeddings(model_path, workers=EMBEDDING_WORKERS)
+        else:
+            raise ValueError(f"Unknown embedding backend: {backend}")
+    return _models[backend]
+
+
+# ---------------- Parity & Throughput ----------------
+def check_parity(texts, backend="onnx-int8", reference="torch"):
+    """
+    Embeds `texts` with both backends and reports cosine agreement and throughput.
+
+    Vectors are L2-normalised by both backends, so the dot product is the cosine.
+    """
+    report = {"texts": len(texts)}
+    vectors = {}
+    for name in (reference, backend):
+        model = get_embedding_model(name)
+        start = time.perf_counter()
+        vectors[name] = np.asarray(model.embed_documents(texts), dtype=np.float32)
+        seconds = time.perf_counter() - start
+        report[f"{name}_texts_per_s"] = round(len(texts) / seconds, 2) if seconds > 0 else None
+
+    cosines = (vectors[reference] * vectors[backend]).sum(axis=1)
+    report["min_cosine"] = round(float(cosines.min()), 5)
+    report["mean_cosine"] = round(float(cosines.mean()), 5)
+    return report
+
+
+if __name__ == "__main__":
+    import glob
+    import json
+    from rag.policy_store import chunk_policy_text
+    from utils.utils import clean_text
+
+    sample_texts = []
+    for path in sorted(glob.glob("data/scraped_policies/*/*.txt")):
+        with open(path, "r", encoding="utf-8") as f:
+            sample_texts += chunk_policy_text(clean_text(f.read()))
+
+    for candidate in ("onnx", "onnx-int8"):
+        print(f"[INFO] Parity check: torch vs {candidate}")
+        print(json.dumps(check_parity(sample_texts, backend=candidate), indent=2))
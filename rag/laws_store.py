@@ -1,11 +1,13 @@
 import os
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from rag.embeddings import get_embedding_model
 from utils.utils import clean_text
+from utils.tracing import stage, record_count
+from utils.dedup import strip_boilerplate, dedup_for_ingestion, DEDUP_REPORT_DIR
 
 # Load the embedding model (can be reused across pipelines)
-embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+embedding_model = get_embedding_model()
 
 
 def chunk_regulation_text(text, chunk_size=500, chunk_overlap=50):
@@ -14,16 +16,27 @@ def chunk_regulation_text(text, chunk_size=500, chunk_overlap=50):
         chunk_overlap=chunk_overlap,
         separators=["\n\n", "\n", ".", " "]
     )
-    return splitter.split_text(text)
+    with stage("chunk", source="regulation") as info:
+        chunks = splitter.split_text(text)
+        info["chunks"] = len(chunks)
+    record_count("chunks", len(chunks), source="regulation")
+    return chunks
 
 
-def build_regulation_vectorstore(regulation_docs: dict, base_save_path="./data/vector_stores/regulations"):
+def regulation_store_path(law_name, base_path="./data/vector_stores/regulations"):
+    return os.path.join(base_path, law_name.lower().replace(" ", "_"))
+
+
+def build_regulation_vectorstore(regulation_docs: dict, base_save_path="./data/vector_stores/regulations", dedup=True,
+                                 report_dir=DEDUP_REPORT_DIR):
     """
     Builds a FAISS vectorstore for each regulation (GDPR, CCPA).
     
     Args:
         regulation_docs: dict with keys as regulation names (e.g., "GDPR") and values as full regulation text.
         base_save_path: base directory where vector DBs will be saved separately per regulation.
+        dedup: strip repeated page headers/footers and drop near-duplicate chunks before embedding.
+        report_dir: where the dedup report for each regulation is written.
     
     Returns:
         dict of regulation name to their FAISS vector store objects.
@@ -32,13 +45,25 @@ def build_regulation_vectorstore(regulation_docs: dict, base_save_path="./data/v
 
     for law_name, full_text in regulation_docs.items():
         print(f"[INFO] Processing regulation: {law_name}")
+        removed_lines = {}
+        if dedup:
+            with stage("dedup.boilerplate", law=law_name):
+                full_text, removed_lines = strip_boilerplate(full_text)
+
         cleaned_text = clean_text(full_text)
         chunks = chunk_regulation_text(cleaned_text)
+        if dedup:
+            chunks = dedup_for_ingestion(law_name, chunks, removed_lines, report_dir)
         metadatas = [{"law": law_name} for _ in chunks]
 
-        vectorstore = FAISS.from_texts(chunks, embedding=embedding_model, metadatas=metadatas)
-        
-        save_path = os.path.join(base_save_path, law_name.lower().replace(" ", "_"))
+        with stage("embed", law=law_name, chunks=len(chunks)):
+            embeddings = embedding_model.embed_documents(chunks)
+        record_count("embeddings", len(embeddings), source="regulation")
+
+        with stage("index_build", law=law_name):
+            vectorstore = FAISS.from_embeddings(list(zip(chunks, embeddings)), embedding=embedding_model, metadatas=metadatas)
+
+        save_path = regulation_store_path(law_name, base_save_path)
         vectorstore.save_local(save_path)
         vectorstores[law_name] = vectorstore
 
@@ -51,5 +76,6 @@ def load_regulation_vectorstore(law_name, base_path="./data/vector_stores/regula
     """
     Loads a saved regulation vector store (GDPR or CCPA).
     """
-    load_path = os.path.join(base_path, law_name.lower().replace(" ", "_"))
-    return FAISS.load_local(load_path, embeddings=embedding_model,allow_dangerous_deserialization=True)
+    load_path = regulation_store_path(law_name, base_path)
+    with stage("store_load", store=law_name):
+        return FAISS.load_local(load_path, embeddings=embedding_model,allow_dangerous_deserialization=True)
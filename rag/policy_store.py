@@ -1,10 +1,14 @@
 import os
+import json
+from urllib.parse import urlparse
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.vectorstores import FAISS
-from langchain.embeddings import HuggingFaceEmbeddings
+from rag.embeddings import get_embedding_model
 from utils.utils import clean_text
+from utils.tracing import stage, record_count
+from utils.dedup import strip_boilerplate, dedup_for_ingestion, DEDUP_REPORT_DIR
 
-embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+embedding_model = get_embedding_model()
 
 def chunk_policy_text(text, chunk_size=500, chunk_overlap=50):
     splitter = RecursiveCharacterTextSplitter(
@@ -12,14 +16,55 @@ def chunk_policy_text(text, chunk_size=500, chunk_overlap=50):
         chunk_overlap=chunk_overlap,
         separators=["\n\n", "\n", ".", " "]
     )
-    return splitter.split_text(text)
+    with stage("chunk", source="policy") as info:
+        chunks = splitter.split_text(text)
+        info["chunks"] = len(chunks)
+    record_count("chunks", len(chunks), source="policy")
+    return chunks
+
+def build_policy_vectorstore(text, url, dedup=True, report_dir=DEDUP_REPORT_DIR):
+    removed_lines = {}
+    if dedup:
+        # Strip nav/footer lines while the scraped line structure is still intact
+        with stage("dedup.boilerplate"):
+            text, removed_lines = strip_boilerplate(text)
 
-def build_policy_vectorstore(text, url):
     cleaned = clean_text(text)
     chunks = chunk_policy_text(cleaned)
+    if dedup:
+        chunks = dedup_for_ingestion(policy_domain(url), chunks, removed_lines, report_dir)
     metadatas = [{"source_url": url} for _ in chunks]
 
-    return FAISS.from_texts(chunks, embedding=embedding_model, metadatas=metadatas)
+    with stage("embed", chunks=len(chunks)):
+        embeddings = embedding_model.embed_documents(chunks)
+    record_count("embeddings", len(embeddings), source="policy")
+
+    with stage("index_build"):
+        return FAISS.from_embeddings(list(zip(chunks, embeddings)), embedding=embedding_model, metadatas=metadatas)
+
+STORE_META_FILE = "store_meta.json"
+
+def policy_domain(url):
+    return urlparse(url).netloc.replace("www.", "") or url
+
+def vectorstore_source_url(vectorstore):
+    """Source URL recorded in the chunk metadata of a policy store, or None."""
+    if not vectorstore.index_to_docstore_id:
+        return None
+    first_doc = vectorstore.docstore.search(vectorstore.index_to_docstore_id[0])
+    return getattr(first_doc, "metadata", {}).get("source_url")
 
 def save_vectorstore(vectorstore, path="./data/vector_stores/policy_store"):
     vectorstore.save_local(path)
+
+    # Record which site the store holds so results can be keyed by domain without loading it
+    source_url = vectorstore_source_url(vectorstore)
+    with open(os.path.join(path, STORE_META_FILE), "w", encoding="utf-8") as f:
+        json.dump({"source_url": source_url, "domain": policy_domain(source_url) if source_url else None}, f)
+
+def load_store_meta(path="./data/vector_stores/policy_store"):
+    meta_path = os.path.join(path, STORE_META_FILE)
+    if not os.path.exists(meta_path):
+        return {}
+    with open(meta_path, "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,268 @@
+import os
+import re
+import json
+import hashlib
+from collections import Counter, defaultdict
+from utils.tracing import stage, record_count
+
+DEDUP_REPORT_DIR = "data/dedup_reports"
+
+SECTION_HEADER = re.compile(r"^===== (.+?) =====$", re.MULTILINE)
+
+# Navigation / banner lines that carry no policy content on any site
+COMMON_BOILERPLATE = re.compile(
+    r"^(sign in|sign up|log in|login|join \w+|help center|help|print|menu|search|home|back to .{0,40}|"
+    r"skip to (main )?content|accept( all)?( cookies)?|reject( all)?( cookies)?|cookie (settings|preferences)|"
+    r"manage (cookies|preferences)|close|ok|got it|all rights reserved\.?|"
+    # Copyright footers need a year or "all rights reserved"; "Copyright Infringement" is a heading
+    r"(©|copyright)( ©)?\s*\d{4}.*|(©|copyright) .*all rights reserved\.?)$",
+    re.IGNORECASE
+)
+
+# Effective / last-updated dates are policy content even when every section repeats them
+DATE_LINE = re.compile(
+    r"^(last (updated|modified|revised)|effective( date)?|updated)\b|"
+    r"\b(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.? \d{1,2},? \d{4}\b|"
+    r"\b\d{1,2} (jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]* \d{4}\b|"
+    r"\b\d{4}-\d{2}-\d{2}\b|\b\d{1,2}/\d{1,2}/\d{2,4}\b",
+    re.IGNORECASE
+)
+
+MAX_BOILERPLATE_WORDS = 12   # only short lines (nav, footers, headers) are treated as boilerplate
+MIN_LINE_REPEATS = 3         # a very short line repeated this often in one document is boilerplate
+MAX_REPEATED_LINE_WORDS = 3  # ...at most this many words, or a numbered header/footer
+MAX_RUN_LINE_WORDS = 5       # menu / table-of-contents entries; a heading is followed by something longer
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4            # with max distance 3, near-duplicates share at least one 16-bit band
+MAX_HAMMING_DISTANCE = 3
+
+
+def _line_key(line, mask_digits=False):
+    key = re.sub(r"\s+", " ", line.strip().lower())
+    # Page numbers and dates vary between otherwise identical headers/footers
+    return re.sub(r"\d+", "#", key) if mask_digits else key
+
+
+def _is_fragment(line):
+    # Inline link text split out by get_text: starts lowercase or punctuation, or has no letters at all
+    return line[0].islower() or not line[0].isalnum() or not re.search(r"[^\W\d_]", line)
+
+
+def split_sections(text):
+    """Splits scraped text on its '===== Policy =====' headers; returns a list of section bodies."""
+    parts = SECTION_HEADER.split(text)
+    # split() yields [preamble, title, body, title, body, ...]
+    bodies = [parts[0]] + parts[2::2]
+    return [body for body in bodies if body.strip()]
+
+
+# ---------------- Boilerplate Lines ----------------
+def strip_boilerplate(text, min_repeats=MIN_LINE_REPEATS, max_words=MAX_BOILERPLATE_WORDS):
+    """
+    Removes short lines that are navigation/footer boilerplate.
+
+    A line is dropped when it matches COMMON_BOILERPLATE, appears in more than one
+    policy section of the same site, or repeats `min_repeats` times in the document
+    while being at most MAX_REPEATED_LINE_WORDS words or a numbered header/footer.
+
+    The last two rules only drop a line sitting in a run of short lines (a menu,
+    footer or table of contents). The same text directly followed by a paragraph is
+    a heading, and next to an inline fragment it is part of a sentence, so those
+    occurrences are kept. Section headers and date lines are always kept, and a line
+    repeated only within one section keeps at least its last occurrence.
+
+    Returns:
+        (cleaned_text, removed) where removed maps each dropped line to its count.
+    """
+    sections = split_sections(text)
+    section_counts = Counter()
+    for body in sections:
+        section_counts.update({_line_key(line) for line in body.splitlines() if line.strip()})
+    lines = [line for line in text.splitlines() if line.strip()]
+    line_counts = Counter(_line_key(line) for line in lines)
+    masked_counts = Counter(_line_key(line, mask_digits=True) for line in lines)
+
+    all_lines = text.splitlines()
+    next_lines = [None] * len(all_lines)
+    following = None
+    for i in range(len(all_lines) - 1, -1, -1):
+        next_lines[i] = following
+        if all_lines[i].strip():
+            following = all_lines[i].strip()
+
+    drop = [False] * len(all_lines)
+    last_repeat = {}  # key -> index of the last occurrence dropped only as a within-section repeat
+    for i, (line, next_line) in enumerate(zip(all_lines, next_lines)):
+        stripped = line.strip()
+        if (not stripped or SECTION_HEADER.match(stripped) or DATE_LINE.search(stripped)
+                or len(stripped.split()) > max_words):
+            continue
+        key = _line_key(stripped)
+        # Headings are followed by a paragraph; inline text by a sentence fragment
+        in_short_run = (
+            next_line is not None
+            and len(next_line.split()) <= MAX_RUN_LINE_WORDS
+            and not _is_fragment(next_line)
+            and not SECTION_HEADER.match(next_line)
+        )
+        exempt = _is_fragment(stripped) or not in_short_run
+        masked_key = _line_key(stripped, mask_digits=True)
+        short_repeat = len(stripped.split()) <= MAX_REPEATED_LINE_WORDS and line_counts[key] >= min_repeats
+        # Longer lines that repeat up to their numbers, like PDF page headers/footers
+        numbered_repeat = (
+            len(stripped.split()) > MAX_REPEATED_LINE_WORDS
+            and masked_key != key
+            and masked_counts[masked_key] >= min_repeats
+        )
+        repeated = not exempt and (short_repeat or numbered_repeat)
+        shared = not exempt and section_counts[key] > 1
+        common = COMMON_BOILERPLATE.match(stripped)
+        drop[i] = bool(common or shared or repeated)
+        if drop[i] and not common and section_counts[key] <= 1:
+            last_repeat[key] = i
+
+    # A line repeated within one section only (a table of contents and its heading)
+    # keeps its last occurrence when the position rule dropped all of them
+    kept_keys = {_line_key(line) for line, dropped in zip(all_lines, drop) if line.strip() and not dropped}
+    for key, i in last_repeat.items():
+        if key not in kept_keys:
+            drop[i] = False
+
+    kept = []
+    removed = Counter()
+    for line, dropped in zip(all_lines, drop):
+        if dropped:
+            removed[line.strip()] += 1
+        else:
+            kept.append(line)
+    return "\n".join(kept), dict(removed)
+
+
+# ---------------- Near-duplicate Chunks ----------------
+def simhash(text, bits=SIMHASH_BITS):
+    """64-bit SimHash over word 3-shingles."""
+    words = re.findall(r"\w+", text.lower())
+    shingles = [" ".join(words[i:i + 3]) for i in range(max(1, len(words) - 2))]
+    weights = [0] * bits
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.md5(shingle.encode("utf-8")).digest()[:bits // 8], "big")
+        for bit in range(bits):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(bits) if weights[bit] > 0)
+
+
+def dedup_chunks(chunks, max_distance=MAX_HAMMING_DISTANCE, bands=SIMHASH_BANDS):
+    """
+    Drops chunks whose SimHash is within `max_distance` bits of an earlier chunk.
+
+    Candidates are found with LSH banding: the hash is split into `bands` bands, and
+    only chunks sharing a band are compared, so this stays near-linear in practice.
+
+    Returns:
+        (kept_indices, dropped) where dropped lists {"index", "duplicate_of", "distance", "preview"}.
+    """
+    band_bits = SIMHASH_BITS // bands
+    band_mask = (1 << band_bits) - 1
+    buckets = defaultdict(list)
+    hashes = []
+    kept, dropped = [], []
+
+    for index, chunk in enumerate(chunks):
+        value = simhash(chunk)
+        band_keys = [(band, value >> (band * band_bits) & band_mask) for band in range(bands)]
+
+        match = None
+        for key in band_keys:
+            for other in buckets[key]:
+                distance = bin(value ^ hashes[other]).count("1")
+                if distance <= max_distance:
+                    match = (other, distance)
+                    break
+            if match:
+                break
+
+        hashes.append(value)
+        if match:
+            dropped.append({"index": index, "duplicate_of": match[0], "distance": match[1], "preview": chunk[:120]})
+            continue
+        kept.append(index)
+        for key in band_keys:
+            buckets[key].append(index)
+
+    return kept, dropped
+
+
+# ---------------- Ingestion Step ----------------
+def dedup_for_ingestion(name, chunks, removed_lines=None, report_dir=DEDUP_REPORT_DIR):
+    """
+    Drops near-duplicate chunks before embedding and saves a report of everything removed.
+
+    Args:
+        name: source name used for the report file (domain or regulation).
+        chunks: chunk texts from the splitter.
+        removed_lines: boilerplate lines already stripped by `strip_boilerplate`.
+        report_dir: folder for the report (benchmarks pass a temp dir).
+
+    Returns:
+        the chunks to embed.
+    """
+    removed_lines = removed_lines or {}
+    with stage("dedup", source=name) as info:
+        kept, dropped = dedup_chunks(chunks)
+        info["chunks_in"] = len(chunks)
+        info["chunks_dropped"] = len(dropped)
+        info["boilerplate_lines"] = sum(removed_lines.values())
+    record_count("chunks_deduplicated", len(dropped))
+
+    report = {
+        "source": name,
+        "chunks_in": len(chunks),
+        "chunks_kept": len(kept),
+        "boilerplate_lines_removed": sum(removed_lines.values()),
+        "boilerplate_lines": removed_lines,
+        "dropped_chunks": dropped
+    }
+    path = save_dedup_report(name, report, report_dir)
+    print(f"[INFO] Dedup {name}: dropped {len(dropped)}/{len(chunks)} chunks, "
+          f"{report['boilerplate_lines_removed']} boilerplate lines (report: {path})")
+    return [chunks[i] for i in kept]
+
+
+# ---------------- Reports ----------------
+def save_dedup_report(name, report, report_dir=DEDUP_REPORT_DIR):
+    """Writes what was removed for one source (domain or regulation) to <report_dir>/<name>.json."""
+    os.makedirs(report_dir, exist_ok=True)
+    safe_name = re.sub(r"[^\w.-]", "_", name)
+    path = os.path.join(report_dir, f"{safe_name}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    return path
+
+
+# -------------------- Main Block -------------------------
+if __name__ == "__main__":
+    # Regression check against the checked-in scraped policies
+    import glob
+
+    for policy_path in sorted(glob.glob("data/scraped_policies/*/*.txt")):
+        with open(policy_path, "r", encoding="utf-8") as f:
+            _, removed = strip_boilerplate(f.read())
+        print(f"[INFO] {policy_path}: removed {sum(removed.values())} lines")
+        for line, count in sorted(removed.items(), key=lambda item: -item[1]):
+            print(f"    {count} x {line}")
+
+    sample = "\n".join([
+        "===== Terms of Use =====",
+        "Copyright Infringement",
+        "If you believe your work has been reproduced in a way that constitutes copyright infringement, contact us.",
+        "Last Updated:",
+        "April 17, 2025",
+        "© 1996-2025, Example.com, Inc. or its affiliates",
+        "Copyright 2025 Example Inc. All rights reserved.",
+    ])
+    kept, removed = strip_boilerplate(sample)
+    assert "Copyright Infringement" in kept.splitlines(), removed
+    assert "April 17, 2025" in kept.splitlines(), removed
+    assert set(removed) == {"© 1996-2025, Example.com, Inc. or its affiliates",
+                            "Copyright 2025 Example Inc. All rights reserved."}, removed
+    print("[INFO] Boilerplate regression sample passed")
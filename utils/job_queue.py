@@ -0,0 +1,235 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import traceback
+from contextlib import ExitStack, contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from utils.tracing import start_trace
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+DEFAULT_DB_PATH = "data/jobs.sqlite3"
+
+
+class ResourceLock:
+    """
+    Readers-writer lock for a shared on-disk resource such as a vector-store folder.
+
+    Any number of readers may hold it together; a writer holds it alone. Waiting
+    writers block new readers so a rebuild is not starved by a stream of checks.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self, timeout=None):
+        """Holds a shared read; raises TimeoutError if a writer keeps it for longer than `timeout` seconds."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: not (self._writer or self._writers_waiting), timeout):
+                raise TimeoutError("Resource is being rewritten")
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class JobQueue:
+    """
+    Local background job runner backed by a thread pool and a SQLite job table.
+
+    Long tasks (scraping, vector-store builds, LLM checks) are submitted here so a
+    Streamlit rerun never aborts or repeats them. Each task is called as
+    `fn(progress, **kwargs)` where `progress(stage, fraction)` records the current
+    stage; its return value must be JSON-serialisable and is stored as the result.
+
+    Each run is traced (utils.tracing) and its stage timings are stored with the job.
+
+    Submitting a job whose (kind, key) matches a queued or running job returns the
+    existing job id instead of starting the work again.
+
+    Jobs declare the shared resources they `reads` and `writes` (e.g. "policy_store");
+    a job writing a resource never runs alongside another job using it, so nothing
+    reads a half-written vector store.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, max_workers=2):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._resource_locks = {}
+        self._init_db()
+
+    # ---------------- SQLite helpers ----------------
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    key TEXT,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    progress REAL DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    trace TEXT,
+                    created_at REAL,
+                    updated_at REAL
+                )
+            """)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "trace" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN trace TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_kind_key ON jobs (kind, key, status)")
+            # Jobs cannot survive a process restart, so anything left active is stale
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE status IN (?, ?)",
+                (FAILED, "Interrupted by restart", time.time(), *ACTIVE_STATES)
+            )
+
+    def _update(self, job_id, **fields):
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    # ---------------- Public API ----------------
+    def submit(self, kind, fn, key=None, reads=(), writes=(), **kwargs):
+        """Queues `fn` and returns its job id, or the id of an identical in-flight job."""
+        with self._lock:
+            resources = {name: "read" for name in reads}
+            resources.update({name: "write" for name in writes})
+            for name in resources:
+                self._resource_locks.setdefault(name, ResourceLock())
+            if key is not None:
+                existing = self.find_active(kind, key)
+                if existing:
+                    return existing["id"]
+
+            job_id = uuid.uuid4().hex
+            now = time.time()
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT INTO jobs (id, kind, key, status, stage, progress, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, 0, ?, ?)",
+                    (job_id, kind, key, QUEUED, "Queued", now, now)
+                )
+            self._executor.submit(self._run, job_id, kind, fn, kwargs, resources)
+            return job_id
+
+    def find_active(self, kind, key):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE kind = ? AND key = ? AND status IN (?, ?) ORDER BY created_at DESC LIMIT 1",
+                (kind, key, *ACTIVE_STATES)
+            ).fetchone()
+        return self._to_dict(row)
+
+    def get(self, job_id):
+        """Returns the job as a dict (status, stage, progress, result, error), or None."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def list_jobs(self, kind=None, limit=20):
+        query = "SELECT * FROM jobs"
+        params = []
+        if kind:
+            query += " WHERE kind = ?"
+            params.append(kind)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    @contextmanager
+    def reading(self, *resources, timeout=None):
+        """
+        Holds read locks on `resources` outside a job, e.g. for a quick lookup on the UI thread.
+
+        Raises TimeoutError when a job writing one of them does not finish within `timeout` seconds.
+        """
+        with self._lock:
+            locks = [(name, self._resource_locks.setdefault(name, ResourceLock())) for name in sorted(resources)]
+        with ExitStack() as held:
+            for _, lock in locks:
+                held.enter_context(lock.read(timeout))
+            yield
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    # ---------------- Worker ----------------
+    def _run(self, job_id, kind, fn, kwargs, resources=None):
+        with ExitStack() as held:
+            # Sorted acquisition keeps two multi-resource jobs from deadlocking
+            for name, mode in sorted((resources or {}).items()):
+                self._update(job_id, stage=f"Waiting for {name}")
+                lock = self._resource_locks[name]
+                held.enter_context(lock.write() if mode == "write" else lock.read())
+            self._run_locked(job_id, kind, fn, kwargs)
+
+    def _run_locked(self, job_id, kind, fn, kwargs):
+        self._update(job_id, status=RUNNING, stage="Starting")
+
+        def progress(stage, fraction=None):
+            fields = {"stage": stage}
+            if fraction is not None:
+                fields["progress"] = max(0.0, min(1.0, float(fraction)))
+            self._update(job_id, **fields)
+
+        with start_trace(kind) as trace:
+            try:
+                result = fn(progress, **kwargs)
+                fields = {"status": DONE, "stage": "Completed", "progress": 1.0, "result": json.dumps(result)}
+            except Exception as e:
+                print(f"[ERROR] Job {job_id} failed: {e}")
+                traceback.print_exc()
+                fields = {"status": FAILED, "error": str(e)}
+        self._update(job_id, trace=json.dumps(trace.to_dict()), **fields)
+
+    @staticmethod
+    def _to_dict(row):
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["trace"] = json.loads(job["trace"]) if job.get("trace") else None
+        return job
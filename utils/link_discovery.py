@@ -0,0 +1,292 @@
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+REQUEST_TIMEOUT = 8
+MAX_WORKERS = 8
+MIN_SCORE = 3            # candidates below this are not trusted as policy links
+MAX_SITEMAPS = 4         # nested sitemaps fetched from a sitemap index
+MIN_HOMEPAGE_ANCHORS = 5  # fewer anchors than this usually means a JS-rendered page
+
+POLICY_KEYWORDS = {
+    "Terms of Use": ["terms", "conditions of use", "user agreement", "tos"],
+    "Privacy Policy": ["privacy", "data protection"],
+    "Cookie Policy": ["cookie"]
+}
+
+# Anchor texts that name the policy outright
+EXACT_ANCHORS = {
+    "Terms of Use": {"terms of use", "terms of service", "terms and conditions", "terms & conditions",
+                     "conditions of use", "terms", "user agreement"},
+    "Privacy Policy": {"privacy policy", "privacy notice", "privacy statement", "privacy"},
+    "Cookie Policy": {"cookie policy", "cookies policy", "cookie notice", "cookies", "use of cookies"}
+}
+
+WELL_KNOWN_PATHS = {
+    "Terms of Use": ["/terms", "/terms-of-use", "/terms-of-service", "/terms-and-conditions", "/legal/terms", "/tos"],
+    "Privacy Policy": ["/privacy", "/privacy-policy", "/privacy-notice", "/legal/privacy", "/privacy.html"],
+    "Cookie Policy": ["/cookies", "/cookie-policy", "/cookie-notice", "/legal/cookies", "/cookies.html"]
+}
+
+# Paths that mention a keyword but are articles rather than the policy itself
+ARTICLE_PATH = re.compile(r"/(blog|news|press|stories|article|articles|posts?|community|forum|careers?)(/|$)", re.I)
+# Consent-manager buttons, not policy documents
+SETTINGS_ANCHOR = re.compile(r"(preferences|settings|choices|manage|opt.?out|do not sell)", re.I)
+LOCALE_PREFIX = re.compile(r"^/([a-z]{2})(?:[-_][a-z]{2})?(/|$)", re.I)
+
+SOURCE_PRIORITY = {"anchor": 0, "well_known": 1, "sitemap": 2}
+
+
+# ---------------- HTTP Client ----------------
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Shared requests session with a connection pool sized for concurrent discovery."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            retry = Retry(total=2, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504))
+            adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS * 2, max_retries=retry)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update({"User-Agent": USER_AGENT, "Accept-Language": "en-US,en;q=0.9"})
+            _session = session
+        return _session
+
+
+def fetch(url, timeout=REQUEST_TIMEOUT):
+    """GETs `url`; returns (final_url, html) on HTTP 200, else None."""
+    try:
+        response = get_session().get(url, timeout=timeout, allow_redirects=True)
+        if response.status_code == 200:
+            return response.url, response.text
+    except requests.RequestException as e:
+        print(f"[INFO] Static fetch failed for {url}: {e}")
+    return None
+
+
+def page_names_policy(html, policy_type):
+    """True when the page's <title> or <h1> names the policy (rules out soft-404s and SPA catch-all routes)."""
+    soup = BeautifulSoup(html, "html.parser")
+    headings = [soup.title.get_text(" ", strip=True) if soup.title else ""]
+    headings += [h1.get_text(" ", strip=True) for h1 in soup.find_all("h1")]
+    return any(_mentions(re.sub(r"\s+", " ", heading).lower(), policy_type) for heading in headings)
+
+
+# ---------------- Scoring ----------------
+def base_domain(url):
+    host = urlparse(url).netloc.lower().split(":")[0]
+    parts = host.split(".")
+    # Keep two labels, or three for country second-level domains like example.co.uk
+    keep = 3 if len(parts) > 2 and len(parts[-2]) <= 3 and len(parts[-1]) == 2 else 2
+    return ".".join(parts[-keep:])
+
+
+def _mentions(words, policy_type, at_start=False):
+    # Keywords must start a word: "tos" should not match "photos", but "cookie" matches "cookies"
+    prefix = "^" if at_start else r"\b"
+    return any(re.search(prefix + re.escape(keyword), words) for keyword in POLICY_KEYWORDS[policy_type])
+
+
+def score_candidate(policy_type, url, site_url, anchor_text="", in_footer=False, in_content=False, site_lang=None):
+    """Heuristic score of `url` as the `policy_type` document of `site_url` (higher is better)."""
+    text = re.sub(r"\s+", " ", anchor_text).strip().lower()
+    parsed = urlparse(url)
+    path = parsed.path.lower()
+    path_words = " ".join(re.split(r"[^a-z0-9]+", path)).strip()
+    last_segment_words = " ".join(re.split(r"[^a-z0-9]+", path.rstrip("/").rsplit("/", 1)[-1])).strip()
+    score = 0.0
+
+    # Anchor text
+    if text in EXACT_ANCHORS[policy_type]:
+        score += 5
+    elif _mentions(text, policy_type):
+        score += 3
+
+    # URL path
+    if _mentions(path_words, policy_type):
+        score += 2
+        if _mentions(last_segment_words, policy_type, at_start=True):
+            score += 1
+
+    if score == 0:
+        return 0.0
+
+    # Site and page structure
+    if base_domain(url) == base_domain(site_url):
+        score += 1
+    else:
+        score -= 3
+    if ARTICLE_PATH.search(path):
+        score -= 4
+    if parsed.query:
+        score -= 1
+    if SETTINGS_ANCHOR.search(text):
+        score -= 3
+    if in_footer:
+        score += 1
+    if in_content:
+        score -= 2
+
+    # Language: prefer the site's own locale
+    locale = LOCALE_PREFIX.match(parsed.path)
+    if locale and site_lang and locale.group(1).lower() != site_lang[:2].lower():
+        score -= 2
+
+    # Shorter paths are more likely the canonical policy page
+    score -= 0.1 * path.count("/")
+    return round(score, 2)
+
+
+def _candidate(policy_type, url, site_url, source, **kwargs):
+    return {
+        "policy_type": policy_type,
+        "url": url,
+        "source": source,
+        "anchor_text": kwargs.get("anchor_text", ""),
+        "score": score_candidate(policy_type, url, site_url, site_lang=kwargs.pop("site_lang", None), **kwargs)
+    }
+
+
+# ---------------- Candidate Sources ----------------
+def anchor_candidates(html, page_url, site_url=None):
+    """Scores every <a href> on a page for each policy type."""
+    site_url = site_url or page_url
+    soup = BeautifulSoup(html, "html.parser")
+    html_tag = soup.find("html")
+    site_lang = html_tag.get("lang") if html_tag else None
+
+    candidates = []
+    for link in soup.find_all("a", href=True):
+        href = link.get("href").strip()
+        if not href or href.startswith(("javascript:", "mailto:", "tel:", "#")):
+            continue
+        url = urljoin(page_url, href).split("#")[0]
+        text = link.get_text(" ", strip=True) or link.get("aria-label", "") or link.get("title", "")
+
+        in_footer = link.find_parent(["footer", "nav"]) is not None or any(
+            "footer" in " ".join(parent.get("class", [])).lower() or "footer" in (parent.get("id") or "").lower()
+            for parent in link.parents if hasattr(parent, "get")
+        )
+        in_content = link.find_parent(["article", "main", "p"]) is not None and not in_footer
+        link_lang = link.get("hreflang") or site_lang
+
+        for policy_type in POLICY_KEYWORDS:
+            candidate = _candidate(
+                policy_type, url, site_url, "anchor",
+                anchor_text=text, in_footer=in_footer, in_content=in_content, site_lang=link_lang
+            )
+            if candidate["score"] > 0:
+                candidates.append(candidate)
+    return candidates
+
+
+def sitemap_candidates(site_url):
+    """Scores policy-looking URLs listed in sitemap.xml (following a sitemap index a few levels)."""
+    root = f"{urlparse(site_url).scheme}://{urlparse(site_url).netloc}"
+    to_visit = [urljoin(root, "/sitemap.xml")]
+    robots = fetch(urljoin(root, "/robots.txt"))
+    if robots:
+        to_visit += re.findall(r"(?im)^sitemap:\s*(\S+)", robots[1])
+
+    candidates, visited = [], set()
+    while to_visit and len(visited) < MAX_SITEMAPS:
+        sitemap_url = to_visit.pop(0)
+        if sitemap_url in visited:
+            continue
+        visited.add(sitemap_url)
+        result = fetch(sitemap_url)
+        if not result:
+            continue
+        for loc in re.findall(r"<loc>\s*([^<\s]+)\s*</loc>", result[1]):
+            if loc.lower().endswith(".xml") or ".xml?" in loc.lower():
+                to_visit.append(loc)
+                continue
+            for policy_type in POLICY_KEYWORDS:
+                candidate = _candidate(policy_type, loc, site_url, "sitemap")
+                if candidate["score"] > 0:
+                    candidates.append(candidate)
+    return candidates
+
+
+def well_known_candidates(site_url, policy_type, path):
+    result = fetch(urljoin(site_url, path))
+    if not result:
+        return []
+    final_url, html = result
+    # Redirects to the homepage or elsewhere lose the keyword and score 0
+    candidate = _candidate(policy_type, final_url, site_url, "well_known")
+    if candidate["score"] <= 0:
+        return []
+    # An HTTP 200 alone proves nothing: soft-404s and SPA routes answer any path.
+    # A page titled as the policy is worth about as much as a matching anchor.
+    if not page_names_policy(html, policy_type):
+        return []
+    candidate["score"] += 2
+    return [candidate]
+
+
+# ---------------- Discovery ----------------
+def rank_candidates(candidates):
+    """Groups candidates by policy type, best first, with duplicate URLs merged."""
+    ranked = {policy_type: {} for policy_type in POLICY_KEYWORDS}
+    for candidate in candidates:
+        best = ranked[candidate["policy_type"]].get(candidate["url"])
+        if best is None or candidate["score"] > best["score"]:
+            ranked[candidate["policy_type"]][candidate["url"]] = candidate
+    return {
+        policy_type: sorted(
+            by_url.values(),
+            key=lambda c: (-c["score"], SOURCE_PRIORITY[c["source"]], len(c["url"]))
+        )
+        for policy_type, by_url in ranked.items()
+    }
+
+
+def best_links(ranked, min_score=MIN_SCORE):
+    return {
+        policy_type: (candidates[0]["url"] if candidates and candidates[0]["score"] >= min_score else None)
+        for policy_type, candidates in ranked.items()
+    }
+
+
+def discover_policy_links(site_url, max_workers=MAX_WORKERS):
+    """
+    Finds policy links without a browser: the homepage HTML, sitemap.xml and
+    well-known policy paths are fetched concurrently and all candidates ranked.
+
+    Returns:
+        dict with "links" ({policy type: url or None}), "candidates" (ranked per type)
+        and "homepage_ok" (False when the static homepage was missing or looked JS-rendered).
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        homepage_future = pool.submit(fetch, site_url)
+        sitemap_future = pool.submit(sitemap_candidates, site_url)
+        well_known_futures = [
+            pool.submit(well_known_candidates, site_url, policy_type, path)
+            for policy_type, paths in WELL_KNOWN_PATHS.items()
+            for path in paths
+        ]
+
+        candidates = []
+        homepage_ok = False
+        homepage = homepage_future.result()
+        if homepage:
+            page_candidates = anchor_candidates(homepage[1], homepage[0], site_url)
+            candidates += page_candidates
+            homepage_ok = homepage[1].lower().count("<a ") >= MIN_HOMEPAGE_ANCHORS
+        candidates += sitemap_future.result()
+        for future in well_known_futures:
+            candidates += future.result()
+
+    ranked = rank_candidates(candidates)
+    return {"links": best_links(ranked), "candidates": ranked, "homepage_ok": homepage_ok}
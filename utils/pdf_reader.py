@@ -1,13 +1,17 @@
 from PyPDF2 import PdfReader
+from utils.tracing import stage, record_count
 
 def read_pdf(file_path):
     try:
-        reader = PdfReader(file_path)
-        text = ""
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
+        with stage("pdf_read", path=file_path) as info:
+            reader = PdfReader(file_path)
+            text = ""
+            for page in reader.pages:
+                page_text = page.extract_text()
+                if page_text:
+                    text += page_text + "\n"
+            info["pages"] = len(reader.pages)
+        record_count("pdf_pages", len(reader.pages))
         return text.strip()
     except Exception as e:
         raise RuntimeError(f"Failed to read PDF at {file_path}: {e}")
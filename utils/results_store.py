@@ -0,0 +1,190 @@
+import os
+import json
+import time
+import pickle
+import sqlite3
+import hashlib
+import threading
+
+DEFAULT_DB_PATH = "data/results.sqlite3"
+
+# (kind, path, size, mtime) -> sha256, so unchanged stores are not re-hashed on every check
+_file_hashes = {}
+_file_hashes_lock = threading.Lock()
+
+
+# ---------------- Fingerprints ----------------
+def hash_text(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _memoised_file_hash(path, kind, compute):
+    stat = os.stat(path)
+    key = (kind, os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _file_hashes_lock:
+        if key in _file_hashes:
+            return _file_hashes[key]
+    value = compute(path)
+    with _file_hashes_lock:
+        _file_hashes[key] = value
+    return value
+
+
+def hash_documents(docstore, index_to_docstore_id):
+    """
+    Content hash of a FAISS docstore: chunk texts and metadata in index order.
+
+    Docstore ids are random uuid4s assigned at build time, so they are left out;
+    a store rebuilt from the same text keeps its fingerprint.
+    """
+    digest = hashlib.sha256()
+    for i in sorted(index_to_docstore_id):
+        doc = docstore.search(index_to_docstore_id[i])
+        digest.update(doc.page_content.encode("utf-8") + b"\0")
+        digest.update(json.dumps(doc.metadata, sort_keys=True, default=str).encode("utf-8") + b"\0")
+    return digest.hexdigest()
+
+
+def hash_vectorstore(vectorstore):
+    """Content hash of a loaded FAISS store (see `hash_documents`)."""
+    return hash_documents(vectorstore.docstore, vectorstore.index_to_docstore_id)
+
+
+def _hash_faiss_pickle(path):
+    # index.pkl holds (docstore, index_to_docstore_id); it is the same file FAISS.load_local trusts
+    with open(path, "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return hash_documents(docstore, index_to_docstore_id)
+
+
+def hash_store_directory(path):
+    """Content hash of a saved FAISS folder, read from its index.pkl without loading the index."""
+    pkl_path = os.path.join(path, "index.pkl")
+    if not os.path.isfile(pkl_path):
+        raise FileNotFoundError(f"Vector store not found at {path}")
+    return _memoised_file_hash(pkl_path, "faiss_docs", _hash_faiss_pickle)
+
+
+def combine_fingerprint(inputs):
+    """Single fingerprint over a dict of named input hashes."""
+    return hash_text(json.dumps(inputs, sort_keys=True))
+
+
+# ---------------- Results Store ----------------
+class ResultsStore:
+    """
+    SQLite store of compliance reports keyed by (domain, policy type, input fingerprint).
+
+    A report is reused while its fingerprint matches; every computed report is kept,
+    so the table doubles as a per-domain status history.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._init_db()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    domain TEXT NOT NULL,
+                    policy_type TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    inputs TEXT,
+                    overall_status TEXT,
+                    report TEXT NOT NULL,
+                    created_at REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_lookup ON results (domain, policy_type, fingerprint)")
+
+    def lookup(self, domain, policy_type, fingerprint):
+        """Returns the stored result for exactly these inputs, or None."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM results WHERE domain = ? AND policy_type = ? AND fingerprint = ? "
+                "ORDER BY created_at DESC LIMIT 1",
+                (domain, policy_type, fingerprint)
+            ).fetchone()
+        return self._to_dict(row)
+
+    def save(self, domain, policy_type, fingerprint, inputs, report):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO results (domain, policy_type, fingerprint, inputs, overall_status, report, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (domain, policy_type, fingerprint, json.dumps(inputs), report.get("overall_status"),
+                 json.dumps(report), time.time())
+            )
+
+    def history(self, domain=None, policy_type=None, limit=50):
+        """Stored results, newest first, optionally filtered by domain and policy type."""
+        query = "SELECT * FROM results"
+        clauses, params = [], []
+        if domain:
+            clauses.append("domain = ?")
+            params.append(domain)
+        if policy_type:
+            clauses.append("policy_type = ?")
+            params.append(policy_type)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def domains(self):
+        with self._connect() as conn:
+            return [row["domain"] for row in conn.execute("SELECT DISTINCT domain FROM results ORDER BY domain")]
+
+    def status_changes(self):
+        """
+        (domain, policy type) pairs whose latest overall status differs from the previous one.
+
+        Returns:
+            list of {"domain", "policy_type", "previous_status", "status", "changed_at"}.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT domain, policy_type, overall_status, created_at FROM results "
+                "ORDER BY domain, policy_type, created_at DESC"
+            ).fetchall()
+
+        changes = []
+        latest = {}
+        for row in rows:
+            key = (row["domain"], row["policy_type"])
+            if key not in latest:
+                latest[key] = row
+                continue
+            if latest[key] is None:
+                continue
+            if row["overall_status"] != latest[key]["overall_status"]:
+                changes.append({
+                    "domain": row["domain"],
+                    "policy_type": row["policy_type"],
+                    "previous_status": row["overall_status"],
+                    "status": latest[key]["overall_status"],
+                    "changed_at": latest[key]["created_at"]
+                })
+            # Only the two most recent results per pair are compared
+            latest[key] = None
+        return changes
+
+    @staticmethod
+    def _to_dict(row):
+        if row is None:
+            return None
+        result = dict(row)
+        result["report"] = json.loads(result["report"])
+        result["inputs"] = json.loads(result["inputs"]) if result["inputs"] else {}
+        return result
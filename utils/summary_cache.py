@@ -0,0 +1,36 @@
+import os
+import time
+import sqlite3
+
+DEFAULT_DB_PATH = "data/summary_cache.sqlite3"
+
+
+class SummaryCache:
+    """SQLite cache of LLM section summaries keyed by a hash of the section text, model and prompt."""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS section_summaries (
+                    key TEXT PRIMARY KEY,
+                    summary TEXT NOT NULL,
+                    created_at REAL
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+
+    def get(self, key):
+        with self._connect() as conn:
+            row = conn.execute("SELECT summary FROM section_summaries WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key, summary):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO section_summaries (key, summary, created_at) VALUES (?, ?, ?)",
+                (key, summary, time.time())
+            )
@@ -0,0 +1,224 @@
+import os
+import json
+import time
+import logging
+import threading
+import contextvars
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Structured log of finished stages and traces (one JSON object per line)
+PIPELINE_LOG_PATH = os.getenv("PIPELINE_LOG_PATH", "logs/pipeline.jsonl")
+
+# Histogram buckets (seconds) for stage durations
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+def _get_logger():
+    logger = logging.getLogger("pipeline")
+    if not logger.handlers:
+        os.makedirs(os.path.dirname(PIPELINE_LOG_PATH) or ".", exist_ok=True)
+        handler = logging.FileHandler(PIPELINE_LOG_PATH, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+def log_event(event, **fields):
+    _get_logger().info(json.dumps({"ts": time.time(), "event": event, **fields}, default=str))
+
+
+# ---------------- Metrics Registry ----------------
+class MetricsRegistry:
+    """In-process counters and duration histograms rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            self._counters[(name, tuple(sorted(labels.items())))] += value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.setdefault(key, {"buckets": [0] * len(DURATION_BUCKETS), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if value <= bound:
+                    hist["buckets"][i] += 1
+            hist["sum"] += value
+            hist["count"] += 1
+
+    def render_prometheus(self):
+        def fmt(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self._counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (metric, labels), value in sorted(self._counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{fmt(labels)} {value:g}")
+            for name in sorted({name for name, _ in self._histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (metric, labels), hist in sorted(self._histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, count in zip(DURATION_BUCKETS, hist["buckets"]):
+                        lines.append(f"{name}_bucket{fmt(labels, [('le', bound)])} {count}")
+                    lines.append(f"{name}_bucket{fmt(labels, [('le', '+Inf')])} {hist['count']}")
+                    lines.append(f"{name}_sum{fmt(labels)} {hist['sum']:.6f}")
+                    lines.append(f"{name}_count{fmt(labels)} {hist['count']}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port, host="0.0.0.0"):
+    """
+    Serves this process's registry at http://host:port/metrics from a daemon thread.
+
+    The registry is per process: api.py exposes it on its own /metrics route, and
+    processes without an HTTP API (the Streamlit app) call this instead.
+    Returns the server, or None when the port is unavailable.
+    """
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        print(f"[WARNING] Metrics endpoint not started on port {port}: {e}")
+        return None
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"[INFO] Serving metrics at http://{host}:{port}/metrics")
+    return server
+
+
+# ---------------- Traces ----------------
+class Trace:
+    """Per-request record of stage timings and counts (chunks, tokens, cache hits)."""
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.time()
+        self.stages = []
+        self.counts = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def add_stage(self, entry):
+        with self._lock:
+            self.stages.append(entry)
+
+    def add_count(self, name, value):
+        with self._lock:
+            self.counts[name] += value
+
+    def to_dict(self):
+        return {
+            "trace": self.name,
+            "total_seconds": round(time.time() - self.started, 4),
+            "stages": list(self.stages),
+            "counts": dict(self.counts)
+        }
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextmanager
+def start_trace(name):
+    """Collects every stage run inside the block (in this thread/context) into one Trace."""
+    trace = Trace(name)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        log_event("trace", **trace.to_dict())
+
+
+@contextmanager
+def stage(name, **attrs):
+    """
+    Times a pipeline stage (e.g. "embed", "retrieval", "llm_call").
+
+    Yields a dict; keys added to it inside the block (e.g. chunks=42) are logged
+    with the stage and attached to the current trace.
+    """
+    info = dict(attrs)
+    start = time.perf_counter()
+    error = None
+    try:
+        yield info
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        metrics.observe("pipeline_stage_seconds", seconds, stage=name)
+        if error:
+            metrics.inc("pipeline_stage_errors_total", stage=name)
+        entry = {"stage": name, "seconds": round(seconds, 4), **info}
+        if error:
+            entry["error"] = error
+        trace = current_trace()
+        if trace is not None:
+            trace.add_stage(entry)
+        log_event("stage", trace=trace.name if trace else None, **entry)
+
+
+def record_count(name, value, **labels):
+    """Adds to a counter metric (e.g. chunks) and to the current trace."""
+    metrics.inc(f"pipeline_{name}_total", value, **labels)
+    trace = current_trace()
+    if trace is not None:
+        trace.add_count(name, value)
+
+
+def record_cache(cache, hit):
+    record_count("cache_hits" if hit else "cache_misses", 1, cache=cache)
+
+
+def record_llm_usage(response, model=None):
+    """Records prompt/completion tokens reported on a LangChain chat response."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    prompt_tokens = usage.get("input_tokens")
+    completion_tokens = usage.get("output_tokens")
+    if prompt_tokens is None:
+        token_usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+        prompt_tokens = token_usage.get("prompt_tokens")
+        completion_tokens = token_usage.get("completion_tokens")
+
+    labels = {"model": model} if model else {}
+    if prompt_tokens:
+        record_count("prompt_tokens", prompt_tokens, **labels)
+    if completion_tokens:
+        record_count("completion_tokens", completion_tokens, **labels)
+    return prompt_tokens, completion_tokens
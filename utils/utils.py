@@ -1,6 +1,6 @@
 import os
 from langchain.vectorstores import FAISS
-from langchain.embeddings import HuggingFaceEmbeddings
+from rag.embeddings import get_embedding_model
 from langchain.schema import Document
 
 # Query mapping for each type of policy
@@ -36,7 +36,7 @@ def load_vector_db(regulation: str) -> FAISS:
     if not os.path.exists(os.path.join(db_path, "index.faiss")):
         raise FileNotFoundError(f"Vector DB not found at {db_path}. Run main.py to build it.")
 
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    embeddings = get_embedding_model()
     return FAISS.load_local(db_path, embeddings, allow_dangerous_deserialization=True)
 
 # Fetch relevant docs for a specific policy type (used in run_agents)
@@ -58,10 +58,12 @@ def get_relevant_docs(policy_type: str, regulation: str = "gdpr", top_k: int = 5
     return unique_context
 
 import re
+from utils.tracing import stage
 
 def clean_text(text):
-    text = re.sub(r'\s+', ' ', text)  # remove excessive whitespace
-    return text.strip()
+    with stage("clean", characters=len(text)):
+        text = re.sub(r'\s+', ' ', text)  # remove excessive whitespace
+        return text.strip()
 
 def truncate_text(text, max_tokens=3000):
     words = text.split()
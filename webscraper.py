@@ -2,7 +2,7 @@ import os
 import time
 import random
 import re
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urlparse
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
@@ -11,6 +11,8 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 from bs4 import BeautifulSoup
+from utils.tracing import stage
+from utils.link_discovery import discover_policy_links, anchor_candidates, rank_candidates, best_links
 
 def sanitize_domain(url):
     """Sanitize domain name to be filesystem-safe and consistent."""
@@ -27,6 +29,36 @@ def sanitize_domain(url):
 
 
 def get_policy_links(url):
+    """
+    Finds Terms/Privacy/Cookie links, trying static discovery (homepage HTML, sitemap.xml,
+    well-known paths) first and launching a browser only when that fails.
+    """
+    with stage("scrape.discover_static") as info:
+        discovery = discover_policy_links(url)
+        info["found"] = sum(1 for link in discovery["links"].values() if link)
+    policy_links = discovery["links"]
+
+    if discovery["homepage_ok"] and policy_links["Privacy Policy"]:
+        return policy_links
+
+    print("[INFO] Static discovery incomplete, falling back to browser...")
+    try:
+        with stage("scrape.discover_browser"):
+            browser_candidates = get_policy_links_browser(url)
+    except Exception as e:
+        # Keep whatever static discovery found if Chrome cannot start
+        print(f"Browser discovery failed for {url}: {e}")
+        browser_candidates = None
+    if not browser_candidates:
+        return policy_links
+
+    # Rank the rendered page's anchors together with the static candidates
+    static_candidates = [c for ranked in discovery["candidates"].values() for c in ranked]
+    return best_links(rank_candidates(static_candidates + browser_candidates))
+
+
+def get_policy_links_browser(url):
+    """Renders the homepage in Chrome and returns its scored anchor candidates (None on failure)."""
     options = Options()
     options.add_argument("--headless")
     options.add_argument("--disable-blink-features=AutomationControlled")
@@ -43,23 +75,7 @@ def get_policy_links(url):
     try:
         driver.get(url)
         WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "a")))
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        links = soup.find_all("a", href=True)
-
-        policy_links = {"Terms of Use": None, "Privacy Policy": None, "Cookie Policy": None}
-
-        for link in links:
-            href = link.get("href")
-            text = link.get_text().strip().lower()
-
-            if "terms" in text or "terms" in href:
-                policy_links["Terms of Use"] = urljoin(url, href)
-            elif "privacy" in text or "privacy" in href:
-                policy_links["Privacy Policy"] = urljoin(url, href)
-            elif "cookie" in text or "cookie" in href:
-                policy_links["Cookie Policy"] = urljoin(url, href)
-
-        return policy_links
+        return anchor_candidates(driver.page_source, driver.current_url, url)
     except Exception as e:
         print(f"Error fetching policy links from {url}: {e}")
         return None
@@ -97,7 +113,8 @@ def main(website_url):
     output_dir = os.path.join("data", "scraped_policies", domain)
     os.makedirs(output_dir, exist_ok=True)
 
-    policies = get_policy_links(website_url)
+    with stage("scrape.discover", domain=domain):
+        policies = get_policy_links(website_url) or {}
 
     output_file = os.path.join(output_dir, f"{domain}_Policies.txt")
 
@@ -105,7 +122,9 @@ def main(website_url):
         for policy, link in policies.items():
             if link:
                 print(f"Scraping {policy} from: {link}")
-                policy_text = scrape_policy(link)
+                with stage("scrape", policy=policy) as info:
+                    policy_text = scrape_policy(link)
+                    info["characters"] = len(policy_text or "")
                 if policy_text:
                     file.write(f"===== {policy} =====\n{policy_text}\n\n")
                 else: